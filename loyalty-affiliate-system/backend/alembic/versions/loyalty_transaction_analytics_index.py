@@ -0,0 +1,23 @@
+"""Index loyalty transactions for analytics rollups
+
+Revision ID: 009
+Revises: 008
+Create Date: 2024-03-12 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '009'
+down_revision = '008'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_index('ix_lt_created_type_source', 'loyalty_transactions', ['created_at', 'transaction_type', 'source'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_lt_created_type_source', table_name='loyalty_transactions')
@@ -0,0 +1,26 @@
+"""Add sending message status
+
+Revision ID: 004
+Revises: 003
+Create Date: 2024-02-20 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '004'
+down_revision = '003'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # ALTER TYPE ... ADD VALUE cannot run inside a transaction block on older PostgreSQL
+    with op.get_context().autocommit_block():
+        op.execute("ALTER TYPE messagestatus ADD VALUE IF NOT EXISTS 'sending'")
+
+
+def downgrade() -> None:
+    # PostgreSQL cannot drop a value from an enum type; return claimed rows to pending instead
+    op.execute("UPDATE whatsapp_messages SET status = 'pending' WHERE status = 'sending'")
@@ -0,0 +1,25 @@
+"""Index notification template lookups
+
+Revision ID: 003
+Revises: 002
+Create Date: 2024-02-15 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '003'
+down_revision = '002'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_unique_constraint('uq_notification_template_name', 'notification_templates', ['name'])
+    op.create_index('ix_nt_category_active', 'notification_templates', ['category', 'is_active'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_nt_category_active', table_name='notification_templates')
+    op.drop_constraint('uq_notification_template_name', 'notification_templates', type_='unique')
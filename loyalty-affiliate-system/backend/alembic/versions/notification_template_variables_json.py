@@ -0,0 +1,34 @@
+"""Store notification template variables as JSON
+
+Revision ID: 002
+Revises: 001
+Create Date: 2024-02-01 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '002'
+down_revision = '001'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Existing rows already hold JSON-encoded strings, so cast them in place
+    op.alter_column('notification_templates', 'variables',
+        existing_type=sa.Text(),
+        type_=sa.JSON(),
+        existing_nullable=True,
+        postgresql_using='variables::json'
+    )
+
+
+def downgrade() -> None:
+    op.alter_column('notification_templates', 'variables',
+        existing_type=sa.JSON(),
+        type_=sa.Text(),
+        existing_nullable=True,
+        postgresql_using='variables::text'
+    )
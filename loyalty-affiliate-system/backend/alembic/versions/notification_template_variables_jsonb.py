@@ -0,0 +1,34 @@
+"""Store notification template variables as JSONB
+
+Revision ID: 006
+Revises: 005
+Create Date: 2024-02-26 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision = '006'
+down_revision = '005'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.alter_column('notification_templates', 'variables',
+        existing_type=sa.JSON(),
+        type_=postgresql.JSONB(),
+        existing_nullable=True,
+        postgresql_using='variables::jsonb'
+    )
+
+
+def downgrade() -> None:
+    op.alter_column('notification_templates', 'variables',
+        existing_type=postgresql.JSONB(),
+        type_=sa.JSON(),
+        existing_nullable=True,
+        postgresql_using='variables::json'
+    )
@@ -0,0 +1,23 @@
+"""Track in-flight ERP syncs on their watermark
+
+Revision ID: 008
+Revises: 007
+Create Date: 2024-03-06 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '008'
+down_revision = '007'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('sync_watermarks', sa.Column('sync_started_at', sa.DateTime(timezone=True), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column('sync_watermarks', 'sync_started_at')
@@ -0,0 +1,33 @@
+"""Add ERP sync watermarks
+
+Revision ID: 007
+Revises: 006
+Create Date: 2024-03-04 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '007'
+down_revision = '006'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table('sync_watermarks',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('mapping_type', sa.String(length=50), nullable=False),
+        sa.Column('last_synced_at', sa.DateTime(timezone=True), nullable=False),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text("timezone('utc'::text, now())"), nullable=True),
+        sa.Column('updated_at', sa.DateTime(timezone=True), nullable=True),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('mapping_type')
+    )
+    op.create_index(op.f('ix_sync_watermarks_id'), 'sync_watermarks', ['id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_sync_watermarks_id'), table_name='sync_watermarks')
+    op.drop_table('sync_watermarks')
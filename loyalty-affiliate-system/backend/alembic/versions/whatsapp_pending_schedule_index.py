@@ -0,0 +1,24 @@
+"""Index pending scheduled WhatsApp messages
+
+Revision ID: 005
+Revises: 004
+Create Date: 2024-02-22 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '005'
+down_revision = '004'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_index('ix_whatsapp_pending_sched', 'whatsapp_messages', ['scheduled_for'], unique=False,
+                    postgresql_where=sa.text("status = 'pending'"))
+
+
+def downgrade() -> None:
+    op.drop_index('ix_whatsapp_pending_sched', table_name='whatsapp_messages')
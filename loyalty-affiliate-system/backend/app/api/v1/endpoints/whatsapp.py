@@ -1,9 +1,8 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Query, BackgroundTasks
+from fastapi import APIRouter, Depends, HTTPException, status, Query, BackgroundTasks, Request
 from sqlalchemy.orm import Session
 from typing import Optional, List, Dict
 from pydantic import BaseModel, Field
 from datetime import datetime
-import json
 
 from ...core.database import get_db
 from ...services.whatsapp_service import WhatsAppService
@@ -114,7 +113,7 @@ async def send_whatsapp_message(
 
 @router.post("/webhook", summary="WhatsApp webhook handler")
 async def whatsapp_webhook(
-    request: dict,
+    request: Request,
     db: Session = Depends(get_db)
 ):
     """
@@ -128,13 +127,16 @@ async def whatsapp_webhook(
     whatsapp_service = WhatsAppService(db)
 
     try:
-        result = whatsapp_service.process_webhook(request)
+        # Acknowledge immediately; a Celery worker parses and drains the queue
+        whatsapp_service.enqueue_webhook(await request.body())
 
         return WebhookResponse(
-            status=result["status"],
-            message=result["message"]
+            status="accepted",
+            message="Webhook queued for processing"
         )
 
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
     except Exception as e:
         logger.error(f"Webhook processing error: {e}")
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Webhook processing failed")
@@ -240,7 +242,7 @@ async def create_template(
                 "category": template.category.value,
                 "message_type": template.message_type.value,
                 "content": template.content,
-                "variables": json.loads(template.variables or "[]"),
+                "variables": template.variables or [],
                 "is_active": template.is_active
             }
         }
@@ -0,0 +1,42 @@
+"""
+Celery application used to run background work outside the request cycle.
+"""
+
+from celery import Celery
+
+from .config import settings
+
+
+celery_app = Celery(
+    "loyalty",
+    broker=settings.CELERY_BROKER_URL,
+    backend=settings.CELERY_RESULT_BACKEND,
+    include=["app.tasks.whatsapp_tasks"]
+)
+
+celery_app.conf.update(
+    task_serializer="json",
+    result_serializer="json",
+    accept_content=["json"],
+    timezone="UTC",
+    enable_utc=True,
+    # Inbound webhooks get their own queue so bursts never starve outbound sends
+    task_routes={
+        "whatsapp.send_message": {"queue": "whatsapp"},
+        "whatsapp.mark_sent": {"queue": "whatsapp"},
+        "whatsapp.mark_delivered": {"queue": "whatsapp"},
+        "whatsapp.dispatch_scheduled": {"queue": "whatsapp"},
+        "whatsapp.requeue_stale": {"queue": "whatsapp"},
+        "whatsapp.process_webhook": {"queue": "whatsapp_webhooks"}
+    },
+    beat_schedule={
+        "dispatch-scheduled-whatsapp-messages": {
+            "task": "whatsapp.dispatch_scheduled",
+            "schedule": 30.0
+        },
+        "requeue-stale-whatsapp-messages": {
+            "task": "whatsapp.requeue_stale",
+            "schedule": 300.0
+        }
+    }
+)
@@ -1,5 +1,6 @@
 from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker, DeclarativeBase
+from sqlalchemy.engine import make_url
+from sqlalchemy.orm import sessionmaker, scoped_session, DeclarativeBase
 from typing import Generator
 from .config import settings
 
@@ -8,18 +9,29 @@ class Base(DeclarativeBase):
     pass
 
 
+# Driver-specific engine options
+engine_options = {}
+if make_url(settings.SQLALCHEMY_DATABASE_URI).drivername in ("postgresql", "postgresql+psycopg2"):
+    # INSERT executemany already pages through insertmanyvalues; this also batches
+    # UPDATE/DELETE executemany with psycopg2's execute_batch helper
+    engine_options["executemany_mode"] = "values_plus_batch"
+
 # Create SQLAlchemy engine
 engine = create_engine(
     settings.SQLALCHEMY_DATABASE_URI,
     echo=False,  # Disabled for production - enable only for debugging
     pool_pre_ping=True,
     pool_recycle=300,
-    # Remove SQLite-specific settings - let SQLAlchemy handle database-specific settings
+    insertmanyvalues_page_size=1000,
+    **engine_options
 )
 
 # Create SessionLocal class
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Thread-local sessions for background workers; call WorkerSession.remove() when a job ends
+WorkerSession = scoped_session(SessionLocal)
+
 
 def get_db() -> Generator:
     """
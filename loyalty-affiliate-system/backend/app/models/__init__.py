@@ -28,6 +28,7 @@ from .whatsapp import (
     TemplateCategory
 )
 from .birthday import BirthdayPromotion, BirthdaySchedule, PromotionStatus
+from .sync import SyncWatermark
 
 # Make all models available at package level
 __all__ = [
@@ -50,5 +51,8 @@ __all__ = [
     "MessageType", "MessageDirection", "MessageStatus", "TemplateCategory",
 
     # Birthday models
-    "BirthdayPromotion", "BirthdaySchedule", "PromotionStatus"
+    "BirthdayPromotion", "BirthdaySchedule", "PromotionStatus",
+
+    # Sync models
+    "SyncWatermark"
 ]
\ No newline at end of file
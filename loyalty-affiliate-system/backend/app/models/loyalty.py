@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, Text, ForeignKey, Enum, Boolean, DECIMAL
+from sqlalchemy import Column, Integer, String, DateTime, Text, ForeignKey, Enum, Boolean, DECIMAL, Index
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 from ..core.database import Base
@@ -54,7 +54,8 @@ class LoyaltyTransaction(Base):
 
     # Indexes for performance
     __table_args__ = (
-        {'index': True, 'unique': False, 'mysql_length': None},
+        # Covers the windowed type/source rollup in loyalty analytics
+        Index('ix_lt_created_type_source', 'created_at', 'transaction_type', 'source'),
     )
 
     # Relationships
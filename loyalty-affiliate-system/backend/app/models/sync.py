@@ -0,0 +1,14 @@
+from sqlalchemy import Column, Integer, String, DateTime
+from sqlalchemy.sql import func
+from ..core.database import Base
+
+
+class SyncWatermark(Base):
+    __tablename__ = "sync_watermarks"
+
+    id = Column(Integer, primary_key=True, index=True)
+    mapping_type = Column(String(50), unique=True, nullable=False)  # "customer", "sale", ...
+    last_synced_at = Column(DateTime(timezone=True), nullable=False)  # ERP changes after this are pulled next sync
+    sync_started_at = Column(DateTime(timezone=True))  # Set while a sync of this type is in flight
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), onupdate=func.now())
@@ -1,4 +1,5 @@
-from sqlalchemy import Column, Integer, String, DateTime, Text, ForeignKey, Enum, Boolean
+from sqlalchemy import Column, Integer, String, DateTime, Text, ForeignKey, Enum, Boolean, JSON, Index, UniqueConstraint, text
+from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 from ..core.database import Base
@@ -25,6 +26,7 @@ class MessageStatus(str, enum.Enum):
     READ = "read"
     FAILED = "failed"
     PENDING = "pending"
+    SENDING = "sending"
 
 
 class TemplateCategory(str, enum.Enum):
@@ -60,8 +62,12 @@ class WhatsAppMessage(Base):
     read_at = Column(DateTime(timezone=True))
     created_at = Column(DateTime(timezone=True), server_default=func.now())
 
-    # Indexes (database-agnostic)
-    __table_args__ = ()
+    # Indexes
+    __table_args__ = (
+        # Partial index covering only the rows the scheduler polls for
+        Index('ix_whatsapp_pending_sched', 'scheduled_for',
+              postgresql_where=text("status = 'pending'")),
+    )
 
     # Relationships
     user = relationship("User", back_populates="whatsapp_messages")
@@ -78,7 +84,7 @@ class NotificationTemplate(Base):
     category = Column(Enum(TemplateCategory), nullable=False)
     message_type = Column(Enum(MessageType), default=MessageType.TEXT, nullable=False)
     content = Column(Text, nullable=False)
-    variables = Column(Text)  # JSON array of variable names (e.g., ["name", "points"])
+    variables = Column(JSON().with_variant(JSONB, 'postgresql'))  # Array of variable names (e.g., ["name", "points"])
     media_url = Column(String(500))
     is_active = Column(Boolean, default=True, nullable=False)
     is_default = Column(Boolean, default=False, nullable=False)
@@ -90,8 +96,8 @@ class NotificationTemplate(Base):
 
     # Indexes
     __table_args__ = (
-        {'mysql_index': [('category',)]},
-        {'mysql_index': [('is_active',)]}
+        UniqueConstraint('name', name='uq_notification_template_name'),
+        Index('ix_nt_category_active', 'category', 'is_active'),
     )
 
     # Relationships
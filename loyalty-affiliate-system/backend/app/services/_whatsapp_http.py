@@ -0,0 +1,32 @@
+"""
+WhatsApp HTTP transport
+
+Pooled HTTP session shared by every WhatsApp Business API call in the process.
+"""
+
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+import requests
+
+# (connect, read) timeouts in seconds for WhatsApp API calls
+TIMEOUT = (3.05, 10)
+
+
+def _build_session() -> requests.Session:
+    """Create a pooled HTTP session for WhatsApp API calls."""
+    session = requests.Session()
+    # Every API call is a POST: retry only rate limiting, where the message was not accepted.
+    # Retrying a 5xx could deliver the same message twice.
+    retries = Retry(
+        total=3,
+        backoff_factor=0.2,
+        status_forcelist=(429,),
+        allowed_methods=frozenset({"POST"}),
+        respect_retry_after_header=True
+    )
+    session.mount("https://", HTTPAdapter(pool_connections=100, pool_maxsize=100, max_retries=retries))
+    return session
+
+
+# Module-level so TCP/TLS connections are reused across requests and tasks
+session = _build_session()
@@ -5,17 +5,24 @@ Handles ERP data abstraction, synchronization utilities, direct MSSQL database i
 data transformation, and ERP system connectivity.
 """
 
-from typing import List, Optional, Dict, Tuple, Any, Union
+from typing import List, Optional, Dict, Tuple, Any, Union, Callable, AsyncIterator
 from datetime import datetime, timedelta
 from sqlalchemy.orm import Session
 from sqlalchemy import and_, or_, func, text, case, create_engine
-import json
+from sqlalchemy.exc import IntegrityError, SQLAlchemyError
+import asyncio
 import logging
 import hashlib
+import orjson
+import time
 import uuid
 from enum import Enum
-from dataclasses import dataclass
+from dataclasses import dataclass, astuple
 from abc import ABC, abstractmethod
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from threading import Lock
+from cachetools import LRUCache
 import pyodbc
 
 from ..models import (
@@ -24,12 +31,37 @@ from ..models import (
     LoyaltyTransaction, TransactionType, TransactionSource,
     Reward, RewardRedemption,
     Affiliate, CustomerReferral, AffiliateCommission,
-    WhatsAppMessage, MessageStatus
+    WhatsAppMessage, MessageStatus,
+    SyncWatermark
 )
 from ..core.config import settings
+from ..utils.bulk import bulk_insert, bulk_load
 
 logger = logging.getLogger(__name__)
 
+# ERP record id -> (updated_at, data hash), shared across the per-request service instances;
+# bounded so the least recently synced records are evicted rather than kept forever
+_record_hash_cache: LRUCache = LRUCache(maxsize=100_000)
+_record_hash_cache_lock = Lock()
+
+# How long an in-flight sync claim blocks other callers before it is treated as abandoned
+SYNC_CLAIM_TIMEOUT = timedelta(hours=1)
+
+# Seconds a connector that last passed a health check is reused without re-checking
+CONNECTOR_HEALTH_TTL = 60
+
+# Per-thread map of (ERP type, connection settings) -> (connector, monotonic time of its last
+# successful check); pyodbc connections must not be shared between threads
+_connector_local = threading.local()
+
+
+def _connector_cache() -> Dict[Tuple, Tuple[Any, float]]:
+    """Get the calling thread's connector cache."""
+    cache = getattr(_connector_local, "cache", None)
+    if cache is None:
+        cache = _connector_local.cache = {}
+    return cache
+
 
 class SyncStatus(Enum):
     """Enumeration for synchronization status."""
@@ -38,6 +70,7 @@ class SyncStatus(Enum):
     COMPLETED = "completed"
     FAILED = "failed"
     PARTIAL = "partial"
+    SKIPPED = "skipped"
 
 
 class DataMappingType(Enum):
@@ -87,6 +120,17 @@ class DataMapping:
     is_required: bool = False
 
 
+# Named value transformations a DataMapping can apply to its source field
+MAPPING_TRANSFORMATIONS: Dict[str, Callable[[Any], Any]] = {
+    "uppercase": str.upper,
+    "lowercase": str.lower,
+    "strip": str.strip,
+    "string": str,
+    "integer": int,
+    "float": float,
+}
+
+
 class BaseERPConnector(ABC):
     """Abstract base class for ERP connectors."""
 
@@ -104,14 +148,22 @@ class BaseERPConnector(ABC):
         """Close ERP connection."""
         pass
 
+    async def checkout(self) -> "BaseERPConnector":
+        """Get a connector that can be read from concurrently with this one."""
+        return self
+
+    async def checkin(self, connector: "BaseERPConnector", healthy: bool = True):
+        """Return a connector obtained from checkout."""
+        pass
+
     @abstractmethod
     async def test_connection(self) -> bool:
         """Test ERP connection."""
         pass
 
     @abstractmethod
-    async def get_customers(self, filters: Dict = None) -> List[Dict]:
-        """Get customers from ERP system."""
+    async def get_customers(self, filters: Dict = None, since: Optional[datetime] = None) -> List[Dict]:
+        """Get customers from ERP system, optionally only those changed after since."""
         pass
 
     @abstractmethod
@@ -124,6 +176,21 @@ class BaseERPConnector(ABC):
         """Get sales data from ERP system."""
         pass
 
+    async def iter_customers(self, filters: Dict = None) -> AsyncIterator[Dict]:
+        """Stream customers from ERP system."""
+        for customer in await self.get_customers(filters):
+            yield customer
+
+    async def iter_products(self, filters: Dict = None) -> AsyncIterator[Dict]:
+        """Stream products from ERP system."""
+        for product in await self.get_products(filters):
+            yield product
+
+    async def iter_sales(self, filters: Dict = None) -> AsyncIterator[Dict]:
+        """Stream sales data from ERP system."""
+        for sale in await self.get_sales(filters):
+            yield sale
+
     @abstractmethod
     async def sync_customer(self, customer_data: Dict) -> Dict:
         """Sync customer data to ERP system."""
@@ -150,38 +217,89 @@ class LogicERPConnector(BaseERPConnector):
         )
         self.db_connection = None
         self.cursor = None
+        # pyodbc connections are not thread-safe, so every call on this one runs on its own thread
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="logic-erp")
+        # Idle extra connections lent out by checkout for parallel reads
+        self._pool: List["LogicERPConnector"] = []
+
+    async def _run(self, call: Callable, *args) -> Any:
+        """Run a blocking pyodbc call on this connection's thread, off the event loop."""
+        return await asyncio.get_running_loop().run_in_executor(self._executor, call, *args)
+
+    def _query(self, query: str, *params) -> List[Dict]:
+        """Run a query on the shared cursor and return its rows as dicts."""
+        self.cursor.execute(query, *params)
+        columns = [column[0] for column in self.cursor.description]
+        return [dict(zip(columns, row)) for row in self.cursor.fetchall()]
+
+    def _open_cursor(self, query: str):
+        """Execute a query on a dedicated cursor, leaving its result set open for streaming."""
+        cursor = self.db_connection.cursor()
+        cursor.execute(query)
+        return cursor
+
+    def _open(self):
+        """Open the connection and its shared cursor."""
+        self.db_connection = pyodbc.connect(self.connection_string)
+        self.cursor = self.db_connection.cursor()
+
+    def _close(self):
+        """Close the shared cursor and the connection."""
+        if self.cursor:
+            self.cursor.close()
+        if self.db_connection:
+            self.db_connection.close()
 
     async def connect(self) -> bool:
         """Establish connection to Logic ERP MSSQL database."""
         try:
-            self.db_connection = pyodbc.connect(self.connection_string)
-            self.cursor = self.db_connection.cursor()
+            await self._run(self._open)
             logger.info("Successfully connected to Logic ERP MSSQL database")
             return True
         except Exception as e:
             logger.error(f"Failed to connect to Logic ERP MSSQL: {e}")
             return False
 
+    async def checkout(self) -> BaseERPConnector:
+        """Take an idle pooled connection for exclusive use, opening a new one if none is free."""
+        if self._pool:
+            return self._pool.pop()
+        connector = LogicERPConnector(self.connection)
+        if await connector.connect():
+            return connector
+        return self
+
+    async def checkin(self, connector: BaseERPConnector, healthy: bool = True):
+        """Return a checked-out connection to the pool, closing it instead if it broke."""
+        if connector is self:
+            return
+        if healthy:
+            self._pool.append(connector)
+        else:
+            await connector.disconnect()
+
     async def disconnect(self):
         """Close Logic ERP MSSQL connection."""
-        if self.cursor:
-            self.cursor.close()
-        if self.db_connection:
-            self.db_connection.close()
+        pooled, self._pool = self._pool, []
+        for connector in pooled:
+            await connector.disconnect()
+        await self._run(self._close)
+        self._executor.shutdown(wait=False)
         logger.info("Disconnected from Logic ERP MSSQL database")
 
     async def test_connection(self) -> bool:
         """Test Logic ERP MSSQL connection."""
         try:
-            self.cursor.execute("SELECT 1 as test")
-            result = self.cursor.fetchone()
-            return result is not None
+            return bool(await self._run(self._query, "SELECT 1 as test"))
         except Exception as e:
             logger.error(f"Connection test failed: {e}")
             return False
 
-    async def get_customers(self, filters: Dict = None) -> List[Dict]:
-        """Get customers from Logic ERP MSSQL database."""
+    async def get_customers(self, filters: Dict = None, since: Optional[datetime] = None) -> List[Dict]:
+        """Get customers from Logic ERP MSSQL database, optionally only those changed after since.
+
+        Raises on failure: an empty list would read as "no changes" and advance the sync watermark.
+        """
         try:
             # Query based on actual Logic ERP table structure
             query = """
@@ -191,7 +309,8 @@ class LogicERPConnector(BaseERPConnector):
                     EmailAddress as email_address,
                     PhoneNumber as phone_number,
                     Status as status,
-                    CAST(CustomerID as VARCHAR(50)) as customer_id_str
+                    CAST(CustomerID as VARCHAR(50)) as customer_id_str,
+                    ModifiedDate as updated_at
                 FROM Customers
                 WHERE Status = 'Active'
             """
@@ -209,20 +328,24 @@ class LogicERPConnector(BaseERPConnector):
                 if 'status' in filters:
                     filter_conditions.append(f"Status = '{filters['status']}'")
 
+            # Incremental syncs filter on the ERP side so only changed rows cross the wire
+            params = []
+            if since is not None:
+                filter_conditions.append("ModifiedDate > ?")
+                params.append(since)
+
             if filter_conditions:
                 query += " AND " + " AND ".join(filter_conditions)
 
             query += " ORDER BY CustomerID DESC"
 
-            self.cursor.execute(query)
-            columns = [column[0] for column in self.cursor.description]
-            results = [dict(zip(columns, row)) for row in self.cursor.fetchall()]
+            results = await self._run(self._query, query, *params)
 
             logger.info(f"Retrieved {len(results)} customers from Logic ERP")
             return results
         except Exception as e:
             logger.error(f"Failed to get customers from Logic ERP: {e}")
-            return []
+            raise
 
     async def get_products(self, filters: Dict = None) -> List[Dict]:
         """Get products from Logic ERP MSSQL database."""
@@ -248,9 +371,7 @@ class LogicERPConnector(BaseERPConnector):
 
             query += " ORDER BY ProductID DESC"
 
-            self.cursor.execute(query)
-            columns = [column[0] for column in self.cursor.description]
-            results = [dict(zip(columns, row)) for row in self.cursor.fetchall()]
+            results = await self._run(self._query, query)
 
             logger.info(f"Retrieved {len(results)} products from Logic ERP")
             return results
@@ -258,44 +379,48 @@ class LogicERPConnector(BaseERPConnector):
             logger.error(f"Failed to get products from Logic ERP: {e}")
             return []
 
+    def _sales_query(self, filters: Dict = None) -> str:
+        """Build the Logic ERP SalesOrders query for the given filters."""
+        # Query based on actual Logic ERP SalesOrders table structure
+        query = """
+            SELECT
+                so.OrderID as id,
+                so.CustomerID as customer_id,
+                so.OrderDate as order_date,
+                so.TotalAmount as total_amount,
+                so.PaymentStatus as payment_status,
+                CAST(so.OrderID as VARCHAR(50)) as order_id_str,
+                CAST(so.CustomerID as VARCHAR(50)) as customer_id_str
+            FROM SalesOrders so
+            WHERE so.PaymentStatus IS NOT NULL
+        """
+
+        filter_conditions = []
+        if filters:
+            if 'order_id' in filters:
+                filter_conditions.append(f"so.OrderID = {filters['order_id']}")
+            if 'customer_id' in filters:
+                filter_conditions.append(f"so.CustomerID = {filters['customer_id']}")
+            if 'payment_status' in filters:
+                filter_conditions.append(f"so.PaymentStatus = '{filters['payment_status']}'")
+            if 'date_from' in filters:
+                filter_conditions.append(f"so.OrderDate >= '{filters['date_from']}'")
+            if 'date_to' in filters:
+                filter_conditions.append(f"so.OrderDate <= '{filters['date_to']}'")
+
+        if filter_conditions:
+            query += " AND " + " AND ".join(filter_conditions)
+
+        query += " ORDER BY so.OrderDate DESC"
+
+        return query
+
     async def get_sales(self, filters: Dict = None) -> List[Dict]:
         """Get sales data from Logic ERP MSSQL database."""
         try:
-            # Query based on actual Logic ERP SalesOrders table structure
-            query = """
-                SELECT
-                    so.OrderID as id,
-                    so.CustomerID as customer_id,
-                    so.OrderDate as order_date,
-                    so.TotalAmount as total_amount,
-                    so.PaymentStatus as payment_status,
-                    CAST(so.OrderID as VARCHAR(50)) as order_id_str,
-                    CAST(so.CustomerID as VARCHAR(50)) as customer_id_str
-                FROM SalesOrders so
-                WHERE so.PaymentStatus IS NOT NULL
-            """
-
-            filter_conditions = []
-            if filters:
-                if 'order_id' in filters:
-                    filter_conditions.append(f"so.OrderID = {filters['order_id']}")
-                if 'customer_id' in filters:
-                    filter_conditions.append(f"so.CustomerID = {filters['customer_id']}")
-                if 'payment_status' in filters:
-                    filter_conditions.append(f"so.PaymentStatus = '{filters['payment_status']}'")
-                if 'date_from' in filters:
-                    filter_conditions.append(f"so.OrderDate >= '{filters['date_from']}'")
-                if 'date_to' in filters:
-                    filter_conditions.append(f"so.OrderDate <= '{filters['date_to']}'")
-
-            if filter_conditions:
-                query += " AND " + " AND ".join(filter_conditions)
+            query = self._sales_query(filters)
 
-            query += " ORDER BY so.OrderDate DESC"
-
-            self.cursor.execute(query)
-            columns = [column[0] for column in self.cursor.description]
-            results = [dict(zip(columns, row)) for row in self.cursor.fetchall()]
+            results = await self._run(self._query, query)
 
             logger.info(f"Retrieved {len(results)} sales from Logic ERP")
             return results
@@ -303,6 +428,22 @@ class LogicERPConnector(BaseERPConnector):
             logger.error(f"Failed to get sales from Logic ERP: {e}")
             return []
 
+    async def iter_sales(self, filters: Dict = None, batch_size: int = 500) -> AsyncIterator[Dict]:
+        """Stream sales from Logic ERP MSSQL database a batch of rows at a time."""
+        # A dedicated cursor keeps other queries from clobbering the open result set
+        cursor = await self._run(self._open_cursor, self._sales_query(filters))
+        columns = [column[0] for column in cursor.description]
+
+        try:
+            while True:
+                rows = await self._run(cursor.fetchmany, batch_size)
+                if not rows:
+                    break
+                for row in rows:
+                    yield dict(zip(columns, row))
+        finally:
+            await self._run(cursor.close)
+
     async def sync_customer(self, customer_data: Dict) -> Dict:
         """Sync customer data to Logic ERP MSSQL database."""
         try:
@@ -331,11 +472,14 @@ class LogicERPConnector(BaseERPConnector):
 class ERPIntegrationService:
     """Service class for ERP integration and data synchronization."""
 
-    def __init__(self, db: Session):
+    def __init__(self, db: Session, concurrency: int = 4):
         self.db = db
         self.connector = None
         self.mappings = {}
+        self._compiled_mappings = {}
         self.sync_history = []
+        # Caps how many ERP reads this service has in flight at once
+        self._conn_sem = asyncio.Semaphore(concurrency)
 
     def configure_connection(self, connection_config: Dict) -> ERPConnection:
         """Configure ERP connection from settings."""
@@ -350,15 +494,34 @@ class ERPIntegrationService:
         )
 
     async def initialize_connector(self, erp_type: str = "logic") -> bool:
-        """Initialize ERP connector."""
+        """Initialize ERP connector, reusing a healthy cached connection when one exists."""
         try:
             # Get connection configuration from settings or database
             connection_config = self._get_connection_config()
 
             connection = self.configure_connection(connection_config)
+            cache_key = (erp_type,) + astuple(connection)
+            connector_cache = _connector_cache()
+
+            cached = connector_cache.pop(cache_key, None)
+            if cached:
+                connector, checked_at = cached
+                now = time.monotonic()
+                if now - checked_at < CONNECTOR_HEALTH_TTL:
+                    connector_cache[cache_key] = cached
+                    self.connector = connector
+                    return True
+                if await connector.test_connection():
+                    connector_cache[cache_key] = (connector, now)
+                    self.connector = connector
+                    return True
+                # Stale connection: tear it down and build a fresh one
+                await connector.disconnect()
+
             self.connector = LogicERPConnector(connection)
 
             if await self.connector.connect():
+                connector_cache[cache_key] = (self.connector, time.monotonic())
                 logger.info(f"Successfully initialized {erp_type} ERP connector")
                 return True
             else:
@@ -404,31 +567,44 @@ class ERPIntegrationService:
         start_time = datetime.utcnow()
         errors = []
 
-        try:
-            if not self.connector:
-                await self.initialize_connector()
+        # Claim the customer watermark before touching the ERP; a sync already in flight wins
+        if not self._watermark_begin(DataMappingType.CUSTOMER.value, started_at=start_time):
+            return SyncResult(
+                status=SyncStatus.SKIPPED,
+                records_processed=0,
+                records_successful=0,
+                records_failed=0,
+                errors=[],
+                duration=0.0,
+                timestamp=datetime.utcnow()
+            )
 
-            # Get customers from ERP
-            erp_customers = await self.connector.get_customers()
+        try:
+            if not self.connector and not await self.initialize_connector():
+                raise ConnectionError("ERP connector unavailable")
 
             if full_sync:
                 # Full sync - process all customers
+                async with self._conn_sem:
+                    erp_customers = await self.connector.get_customers()
                 loyalty_customers = self.db.query(Customer).all()
-                erp_customer_map = {c.get('id'): c for c in erp_customers}
             else:
-                # Incremental sync - process only changed customers
-                last_sync = self._get_last_sync_time('customers')
-                erp_customers = [c for c in erp_customers if self._is_customer_updated(c, last_sync)]
+                # Incremental sync - the ERP returns only customers changed since the watermark
+                last_sync = self._get_last_sync_time(DataMappingType.CUSTOMER.value)
+                async with self._conn_sem:
+                    erp_customers = await self.connector.get_customers(since=last_sync)
                 loyalty_customers = []
-                erp_customer_map = {c.get('id'): c for c in erp_customers}
+            erp_customer_map = {c.get('id'): c for c in erp_customers}
 
             successful_syncs = 0
             failed_syncs = 0
+            # Every record in this sync is stamped with the sync's start time
+            transform_customer = self._record_transformer("customer", sync_ts=start_time)
 
             for erp_customer in erp_customers:
                 try:
                     # Transform ERP customer data to loyalty system format
-                    loyalty_customer_data = self._transform_customer_data(erp_customer)
+                    loyalty_customer_data = transform_customer(erp_customer)
 
                     # Check if customer already exists in loyalty system
                     existing_customer = self.db.query(Customer).filter(
@@ -450,6 +626,12 @@ class ERPIntegrationService:
                     failed_syncs += 1
                     errors.append(f"Failed to sync customer {erp_customer.get('id')}: {str(e)}")
 
+            # Advance the watermark only when nothing failed, so failed customers are re-pulled
+            if failed_syncs == 0:
+                self._watermark_commit(DataMappingType.CUSTOMER.value, completed_at=start_time)
+            else:
+                self._watermark_release(DataMappingType.CUSTOMER.value)
+
             # Update sync status
             self._update_sync_status('customers', len(erp_customers), successful_syncs, failed_syncs)
 
@@ -470,6 +652,8 @@ class ERPIntegrationService:
             )
 
         except Exception as e:
+            self.db.rollback()
+            self._watermark_release(DataMappingType.CUSTOMER.value)
             duration = (datetime.utcnow() - start_time).total_seconds()
             return SyncResult(
                 status=SyncStatus.FAILED,
@@ -491,34 +675,33 @@ class ERPIntegrationService:
                 await self.initialize_connector()
 
             # Get sales from ERP
-            erp_sales = await self.connector.get_sales()
+            async with self._conn_sem:
+                erp_sales = await self.connector.get_sales()
 
             if full_sync:
                 # Full sync - process all sales
                 processed_sales = erp_sales
             else:
                 # Incremental sync - process only new sales
-                last_sync = self._get_last_sync_time('sales')
+                last_sync = self._get_last_sync_time(DataMappingType.SALE.value)
                 processed_sales = [s for s in erp_sales if self._is_sale_new(s, last_sync)]
 
-            successful_syncs = 0
-            failed_syncs = 0
-
-            for erp_sale in processed_sales:
-                try:
-                    # Transform ERP sale data to loyalty transaction
-                    loyalty_transaction = self._transform_sale_data(erp_sale)
-
-                    # Create loyalty transaction
-                    self._create_loyalty_transaction(loyalty_transaction)
-
-                    # Update customer points and tier if necessary
-                    self._update_customer_from_sale(loyalty_transaction)
-
-                    successful_syncs += 1
-                except Exception as e:
-                    failed_syncs += 1
-                    errors.append(f"Failed to sync sale {erp_sale.get('id')}: {str(e)}")
+            transform_sale = self._record_transformer("sale", sync_ts=start_time)
+
+            # Stage the whole batch behind one savepoint and write it with a single bulk load;
+            # if that fails, undo the batch and redo it sale by sale so only bad rows are lost
+            batch = self.db.begin_nested()
+            try:
+                successful_syncs, failed_syncs, errors = self._stage_sales(processed_sales, transform_sale)
+                batch.commit()
+            except Exception as e:
+                # Includes driver errors raised by COPY, which bypasses SQLAlchemy
+                batch.rollback()
+                logger.warning(f"Bulk sales load failed, retrying per sale: {e}")
+                successful_syncs, failed_syncs, errors = self._stage_sales(
+                    processed_sales, transform_sale, isolate=True
+                )
+            self.db.commit()
 
             # Update sync status
             self._update_sync_status('sales', len(processed_sales), successful_syncs, failed_syncs)
@@ -540,6 +723,7 @@ class ERPIntegrationService:
             )
 
         except Exception as e:
+            self.db.rollback()
             duration = (datetime.utcnow() - start_time).total_seconds()
             return SyncResult(
                 status=SyncStatus.FAILED,
@@ -551,39 +735,71 @@ class ERPIntegrationService:
                 timestamp=datetime.utcnow()
             )
 
-    def _transform_customer_data(self, erp_customer: Dict) -> Dict:
-        """Transform Logic ERP customer data to loyalty system format."""
-        # Apply transformations for Logic ERP structure
-        transformed_data = {
-            "erp_id": erp_customer.get("id"),
-            "name": erp_customer.get("customer_name"),
-            "email": erp_customer.get("email_address"),
-            "phone": erp_customer.get("phone_number"),
-            "status": erp_customer.get("status"),
-            "sync_timestamp": datetime.utcnow(),
-            "data_hash": self._calculate_data_hash(erp_customer)
-        }
+    async def sync_all(self, full_sync: bool = False) -> List[SyncResult]:
+        """Synchronize every ERP entity, running independent syncs concurrently."""
+        # Sales resolve their customer by ERP id, so customers must land first
+        results = [await self.sync_customers(full_sync=full_sync)]
+
+        # Later entity syncs join this gather; the semaphore bounds their ERP reads
+        results.extend(await asyncio.gather(
+            self.sync_sales(full_sync=full_sync)
+        ))
+        return results
+
+    def _record_transformer(self, kind: str, sync_ts: Optional[datetime] = None) -> Callable[[Dict], Dict]:
+        """Build the transform for one batch of ERP records, hoisting work shared by every record."""
+        sync_timestamp = sync_ts or datetime.utcnow()
+        calculate_hash = self._calculate_data_hash_for_record
+
+        if kind == "customer":
+            def transform(erp_customer: Dict) -> Dict:
+                # Apply transformations for Logic ERP structure
+                get = erp_customer.get
+                return {
+                    "erp_id": get("id"),
+                    "name": get("customer_name"),
+                    "email": get("email_address"),
+                    "phone": get("phone_number"),
+                    "status": get("status"),
+                    "sync_timestamp": sync_timestamp,
+                    "data_hash": calculate_hash(erp_customer)
+                }
+        elif kind == "sale":
+            def transform(erp_sale: Dict) -> Dict:
+                get = erp_sale.get
+                # Calculate points based on sale amount
+                sale_amount = float(get("total_amount", 0))
+                points_earned = int(sale_amount * 0.01)  # 1 point per $100
+
+                return {
+                    "erp_sale_id": get("id"),
+                    "customer_erp_id": get("customer_id"),
+                    "sale_amount": sale_amount,
+                    "points_earned": points_earned,
+                    "transaction_type": TransactionType.EARNED,
+                    "source": TransactionSource.PURCHASE,
+                    "description": f"Points earned from Order #{get('order_id_str', '')}",
+                    "transaction_date": get("order_date", sync_timestamp),
+                    "payment_status": get("payment_status"),
+                    "sync_timestamp": sync_timestamp
+                }
+        else:
+            raise ValueError(f"Unknown ERP record kind: {kind}")
 
-        return transformed_data
+        return transform
 
-    def _transform_sale_data(self, erp_sale: Dict) -> Dict:
-        """Transform Logic ERP SalesOrders data to loyalty transaction format."""
-        # Calculate points based on sale amount
-        sale_amount = float(erp_sale.get("total_amount", 0))
-        points_earned = int(sale_amount * 0.01)  # 1 point per $100
+    def _transform_many(self, records: List[Dict], kind: str, sync_ts: Optional[datetime] = None) -> List[Dict]:
+        """Transform a batch of ERP records of one kind."""
+        transform = self._record_transformer(kind, sync_ts=sync_ts)
+        return [transform(record) for record in records]
 
-        return {
-            "erp_sale_id": erp_sale.get("id"),
-            "customer_erp_id": erp_sale.get("customer_id"),
-            "sale_amount": sale_amount,
-            "points_earned": points_earned,
-            "transaction_type": TransactionType.EARNED,
-            "source": TransactionSource.PURCHASE,
-            "description": f"Points earned from Order #{erp_sale.get('order_id_str', '')}",
-            "transaction_date": erp_sale.get("order_date", datetime.utcnow()),
-            "payment_status": erp_sale.get("payment_status"),
-            "sync_timestamp": datetime.utcnow()
-        }
+    def _transform_customer_data(self, erp_customer: Dict, sync_ts: Optional[datetime] = None) -> Dict:
+        """Transform Logic ERP customer data to loyalty system format."""
+        return self._record_transformer("customer", sync_ts=sync_ts)(erp_customer)
+
+    def _transform_sale_data(self, erp_sale: Dict, sync_ts: Optional[datetime] = None) -> Dict:
+        """Transform Logic ERP SalesOrders data to loyalty transaction format."""
+        return self._record_transformer("sale", sync_ts=sync_ts)(erp_sale)
 
     def _create_customer(self, customer_data: Dict):
         """Create new customer in loyalty system."""
@@ -663,8 +879,54 @@ class ERPIntegrationService:
 
         self.db.commit()
 
-    def _create_loyalty_transaction(self, transaction_data: Dict):
-        """Create loyalty transaction from sale data."""
+    def _stage_sales(self, erp_sales: List[Dict], transform_sale: Callable[[Dict], Dict],
+                     isolate: bool = False) -> Tuple[int, int, List[str]]:
+        """Credit and write loyalty transactions for sales, returning success/failure counts and errors."""
+        # By default rows go out in one bulk load and database errors propagate to the caller;
+        # with isolate, each sale is written under its own savepoint and counted if it fails
+        successful_syncs = 0
+        failed_syncs = 0
+        errors = []
+        transaction_rows = []
+        # Skip sales repeated within this batch; earlier batches are checked in the database
+        seen_sale_ids = set()
+
+        for erp_sale in erp_sales:
+            savepoint = self.db.begin_nested() if isolate else None
+            try:
+                # Transform ERP sale data to loyalty transaction
+                loyalty_transaction = transform_sale(erp_sale)
+
+                if loyalty_transaction["erp_sale_id"] not in seen_sale_ids:
+                    row = self._create_loyalty_transaction(loyalty_transaction)
+                    if row:
+                        seen_sale_ids.add(row["erp_sale_id"])
+                        if isolate:
+                            bulk_insert(self.db, LoyaltyTransaction, [row])
+                        else:
+                            transaction_rows.append(row)
+
+                # Update customer points and tier if necessary
+                self._update_customer_from_sale(loyalty_transaction)
+
+                if savepoint is not None:
+                    savepoint.commit()
+                successful_syncs += 1
+            except Exception as e:
+                if savepoint is None and isinstance(e, SQLAlchemyError):
+                    # A failed statement leaves the batch unusable; let the caller fall back
+                    raise
+                if savepoint is not None:
+                    savepoint.rollback()
+                failed_syncs += 1
+                errors.append(f"Failed to sync sale {erp_sale.get('id')}: {str(e)}")
+
+        bulk_load(self.db, LoyaltyTransaction, transaction_rows)
+
+        return successful_syncs, failed_syncs, errors
+
+    def _create_loyalty_transaction(self, transaction_data: Dict) -> Optional[Dict]:
+        """Build the loyalty transaction row for a sale and credit the customer's points."""
         # Find customer by ERP ID
         customer = self.db.query(Customer).filter(
             Customer.erp_id == transaction_data["customer_erp_id"]
@@ -672,27 +934,27 @@ class ERPIntegrationService:
 
         if not customer:
             logger.warning(f"Customer not found for ERP ID: {transaction_data['customer_erp_id']}")
-            return
+            return None
 
         # Check if transaction already exists
-        existing_transaction = self.db.query(LoyaltyTransaction).filter(
+        existing_transaction = self.db.query(LoyaltyTransaction.id).filter(
             LoyaltyTransaction.erp_sale_id == transaction_data["erp_sale_id"]
         ).first()
 
         if existing_transaction:
-            return  # Already processed
-
-        # Create loyalty transaction
-        transaction = LoyaltyTransaction(
-            customer_id=customer.id,
-            points=transaction_data["points_earned"],
-            transaction_type=transaction_data["transaction_type"],
-            source=transaction_data["source"],
-            description=transaction_data["description"],
-            created_at=transaction_data["transaction_date"]
-        )
-
-        self.db.add(transaction)
+            return None  # Already processed
+
+        # Plain row for the caller's bulk load rather than a per-sale ORM insert
+        transaction_row = {
+            "user_id": customer.user_id,
+            "customer_id": customer.id,
+            "erp_sale_id": transaction_data["erp_sale_id"],
+            "points": transaction_data["points_earned"],
+            "transaction_type": transaction_data["transaction_type"],
+            "source": transaction_data["source"],
+            "description": transaction_data["description"],
+            "created_at": transaction_data["transaction_date"]
+        }
 
         # Update customer points and tier
         customer.total_points += transaction_data["points_earned"]
@@ -702,7 +964,7 @@ class ERPIntegrationService:
         # Check for tier upgrade
         self._check_tier_upgrade(customer)
 
-        self.db.commit()
+        return transaction_row
 
     def _update_customer_from_sale(self, transaction_data: Dict):
         """Update customer information from sale data."""
@@ -712,7 +974,6 @@ class ERPIntegrationService:
 
         if customer:
             customer.last_activity = datetime.utcnow()
-            self.db.commit()
 
     def _check_tier_upgrade(self, customer: Customer):
         """Check if customer should be upgraded to a higher tier."""
@@ -750,25 +1011,89 @@ class ERPIntegrationService:
             self.db.add(tier_history)
             logger.info(f"Customer {customer.id} upgraded to {next_tier.value}")
 
-    def _is_customer_updated(self, erp_customer: Dict, last_sync: datetime) -> bool:
-        """Check if customer has been updated since last sync."""
-        customer_hash = self._calculate_data_hash(erp_customer)
-        return erp_customer.get("updated_at", datetime.min) > last_sync or customer_hash != erp_customer.get("previous_hash")
-
     def _is_sale_new(self, erp_sale: Dict, last_sync: datetime) -> bool:
         """Check if sale is new since last sync."""
         return erp_sale.get("created_at", datetime.min) > last_sync
 
     def _calculate_data_hash(self, data: Dict) -> str:
         """Calculate hash of data for change detection."""
-        data_str = json.dumps(data, sort_keys=True, default=str)
-        return hashlib.md5(data_str.encode()).hexdigest()
+        # Types orjson can't encode natively (e.g. Decimal amounts from pyodbc) fall back to str
+        payload = orjson.dumps(data, default=str, option=orjson.OPT_SORT_KEYS | orjson.OPT_NON_STR_KEYS)
+        # Change detection only, not security: BLAKE2b-128 outruns MD5 and keeps the 32-char digest
+        return hashlib.blake2b(payload, digest_size=16).hexdigest()
+
+    def _calculate_data_hash_for_record(self, record: Dict) -> str:
+        """Return the record's data hash, reusing the cached one while updated_at is unchanged."""
+        record_id = record.get("id")
+        updated_at = record.get("updated_at")
+        if record_id is None or updated_at is None:
+            return self._calculate_data_hash(record)
+
+        stamp = updated_at.isoformat() if isinstance(updated_at, datetime) else str(updated_at)
+        with _record_hash_cache_lock:
+            cached = _record_hash_cache.get(record_id)
+        if cached and cached[0] == stamp:
+            return cached[1]
+
+        data_hash = self._calculate_data_hash(record)
+        with _record_hash_cache_lock:
+            _record_hash_cache[record_id] = (stamp, data_hash)
+        return data_hash
 
     def _get_last_sync_time(self, sync_type: str) -> datetime:
         """Get the last sync time for a specific sync type."""
-        # This would typically be stored in a sync log table
-        # For now, return a default time
-        return datetime.utcnow() - timedelta(hours=24)
+        last_synced_at = self.db.query(SyncWatermark.last_synced_at).filter(
+            SyncWatermark.mapping_type == sync_type
+        ).scalar()
+
+        # Before the first recorded sync, look back a day
+        return last_synced_at or datetime.utcnow() - timedelta(hours=24)
+
+    def _watermark_begin(self, sync_type: str, started_at: datetime) -> bool:
+        """Mark a sync of this type in flight; False if another sync already holds it."""
+        # Conditional UPDATE so only one caller can claim the row, even across processes
+        claimed = self.db.query(SyncWatermark).filter(
+            SyncWatermark.mapping_type == sync_type,
+            or_(
+                SyncWatermark.sync_started_at.is_(None),
+                SyncWatermark.sync_started_at < started_at - SYNC_CLAIM_TIMEOUT
+            )
+        ).update({SyncWatermark.sync_started_at: started_at}, synchronize_session=False)
+
+        if not claimed:
+            if self.db.query(SyncWatermark.id).filter(SyncWatermark.mapping_type == sync_type).first():
+                return False
+
+            # First sync of this type: start from the same look-back _get_last_sync_time uses
+            self.db.add(SyncWatermark(
+                mapping_type=sync_type,
+                last_synced_at=started_at - timedelta(hours=24),
+                sync_started_at=started_at
+            ))
+            try:
+                self.db.flush()
+            except IntegrityError:
+                # Another caller created the row first and holds the claim
+                self.db.rollback()
+                return False
+
+        self.db.commit()
+        return True
+
+    def _watermark_commit(self, sync_type: str, completed_at: datetime):
+        """Advance the watermark the next incremental sync starts from and release the claim."""
+        self.db.query(SyncWatermark).filter(SyncWatermark.mapping_type == sync_type).update(
+            {SyncWatermark.last_synced_at: completed_at, SyncWatermark.sync_started_at: None},
+            synchronize_session=False
+        )
+        self.db.commit()
+
+    def _watermark_release(self, sync_type: str):
+        """Release an in-flight claim without advancing the watermark."""
+        self.db.query(SyncWatermark).filter(SyncWatermark.mapping_type == sync_type).update(
+            {SyncWatermark.sync_started_at: None}, synchronize_session=False
+        )
+        self.db.commit()
 
     def _update_sync_status(self, sync_type: str, processed: int, successful: int, failed: int):
         """Update synchronization status."""
@@ -810,6 +1135,7 @@ class ERPIntegrationService:
     async def configure_data_mapping(self, mapping_type: DataMappingType, mappings: List[DataMapping]):
         """Configure data mapping between systems."""
         self.mappings[mapping_type.value] = mappings
+        self._compiled_mappings[mapping_type.value] = self._compile_mapping(mappings)
 
         # Store mapping configuration in database for persistence
         # This would typically be stored in a configuration table
@@ -820,6 +1146,45 @@ class ERPIntegrationService:
         """Get data mapping configuration."""
         return self.mappings.get(mapping_type.value, [])
 
+    def _apply_mapping(self, record: Dict, mappings: List[DataMapping]) -> Dict:
+        """Map one ERP record to target fields, resolving each mapping as it goes."""
+        mapped = {}
+        for mapping in mappings:
+            value = record.get(mapping.source_field)
+            if mapping.transformation and value is not None:
+                if mapping.transformation not in MAPPING_TRANSFORMATIONS:
+                    raise ValueError(f"Unknown transformation: {mapping.transformation}")
+                value = MAPPING_TRANSFORMATIONS[mapping.transformation](value)
+            mapped[mapping.target_field] = value
+        return mapped
+
+    def _compile_mapping(self, mappings: List[DataMapping]) -> Callable[[Dict], Dict]:
+        """Resolve mappings once into a record mapper equivalent to _apply_mapping."""
+        fields = []
+        for mapping in mappings:
+            transform = None
+            if mapping.transformation:
+                if mapping.transformation not in MAPPING_TRANSFORMATIONS:
+                    raise ValueError(f"Unknown transformation: {mapping.transformation}")
+                transform = MAPPING_TRANSFORMATIONS[mapping.transformation]
+            fields.append((mapping.target_field, mapping.source_field, transform))
+
+        def map_record(record: Dict) -> Dict:
+            get = record.get
+            mapped = {}
+            for target_field, source_field, transform in fields:
+                value = get(source_field)
+                mapped[target_field] = transform(value) if transform and value is not None else value
+            return mapped
+
+        return map_record
+
+    def get_record_mapper(self, mapping_type: DataMappingType) -> Callable[[Dict], Dict]:
+        """Get the compiled record mapper for a configured mapping type."""
+        if mapping_type.value not in self._compiled_mappings:
+            raise ValueError(f"No data mapping configured for {mapping_type.value}")
+        return self._compiled_mappings[mapping_type.value]
+
     async def validate_data_mapping(self, mapping_type: DataMappingType) -> Dict:
         """Validate data mapping configuration."""
         mappings = self.get_data_mapping(mapping_type)
@@ -846,35 +1211,75 @@ class ERPIntegrationService:
             await self.initialize_connector()
 
         try:
-            customers = await self.connector.get_customers()
-            products = await self.connector.get_products()
-            sales = await self.connector.get_sales()
+            # The three reads are independent, so overlap them rather than waiting on each in turn
+            customers, products, sales = await asyncio.gather(
+                self._summarize_dataset("customers"),
+                self._summarize_dataset("products"),
+                self._summarize_dataset("sales", amount_field="total_amount")
+            )
 
             return {
-                "customers": {
-                    "count": len(customers),
-                    "last_updated": max((c.get("updated_at") for c in customers), default=None)
-                },
-                "products": {
-                    "count": len(products),
-                    "last_updated": max((p.get("updated_at") for p in products), default=None)
-                },
-                "sales": {
-                    "count": len(sales),
-                    "total_amount": sum(float(s.get("total_amount", 0)) for s in sales),
-                    "last_updated": max((s.get("updated_at") for s in sales), default=None)
-                }
+                "customers": customers,
+                "products": products,
+                "sales": sales
             }
         except Exception as e:
             logger.error(f"Failed to get ERP data summary: {e}")
             return {"error": str(e)}
 
+    async def _summarize_dataset(self, dataset: str, amount_field: Optional[str] = None) -> Dict:
+        """Summarize one ERP dataset on a pooled connection so the summaries can run in parallel."""
+        # The semaphore bounds how many pooled connections are checked out at once
+        async with self._conn_sem:
+            connector = await self.connector.checkout()
+            try:
+                summary = await self._summarize_records(getattr(connector, f"iter_{dataset}")(), amount_field)
+            except Exception:
+                await self.connector.checkin(connector, healthy=False)
+                raise
+            await self.connector.checkin(connector)
+            return summary
+
+    async def _summarize_records(self, records: AsyncIterator[Dict], amount_field: Optional[str] = None) -> Dict:
+        """Count streamed ERP records in one pass, tracking the latest update and an optional amount total."""
+        count = 0
+        total_amount = 0.0
+        last_updated = None
+
+        async for record in records:
+            count += 1
+            if amount_field:
+                total_amount += float(record.get(amount_field, 0))
+            updated_at = record.get("updated_at")
+            if updated_at is not None and (last_updated is None or updated_at > last_updated):
+                last_updated = updated_at
+
+        summary = {"count": count, "last_updated": last_updated}
+        if amount_field:
+            summary["total_amount"] = total_amount
+        return summary
+
     def generate_sync_report(self, sync_results: List[SyncResult]) -> Dict:
         """Generate synchronization report."""
-        total_processed = sum(r.records_processed for r in sync_results)
-        total_successful = sum(r.records_successful for r in sync_results)
-        total_failed = sum(r.records_failed for r in sync_results)
-        total_duration = sum(r.duration for r in sync_results)
+        total_processed = total_successful = total_failed = 0
+        total_duration = 0.0
+        details = []
+
+        # Accumulate the totals and build the details in a single pass over the results
+        for r in sync_results:
+            total_processed += r.records_processed
+            total_successful += r.records_successful
+            total_failed += r.records_failed
+            total_duration += r.duration
+            details.append({
+                "sync_type": "customers",
+                "status": r.status.value,
+                "processed": r.records_processed,
+                "successful": r.records_successful,
+                "failed": r.records_failed,
+                "duration": round(r.duration, 2),
+                "timestamp": r.timestamp.isoformat()
+            })
 
         success_rate = (total_successful / total_processed * 100) if total_processed > 0 else 0
 
@@ -886,16 +1291,5 @@ class ERPIntegrationService:
                 "success_rate": round(success_rate, 2),
                 "total_duration": round(total_duration, 2)
             },
-            "details": [
-                {
-                    "sync_type": "customers",
-                    "status": r.status.value,
-                    "processed": r.records_processed,
-                    "successful": r.records_successful,
-                    "failed": r.records_failed,
-                    "duration": round(r.duration, 2),
-                    "timestamp": r.timestamp.isoformat()
-                }
-                for r in sync_results
-            ]
+            "details": details
         }
\ No newline at end of file
@@ -5,10 +5,11 @@ Handles loyalty points management, tier progression, transaction processing,
 and loyalty program business logic.
 """
 
+from bisect import bisect_right
 from datetime import datetime, timedelta
 from typing import Optional, Dict, Any, List
 from sqlalchemy.orm import Session
-from sqlalchemy import func, and_
+from sqlalchemy import func, and_, case, update
 
 from ..models import (
     LoyaltyTransaction, Reward, RewardRedemption,
@@ -18,6 +19,48 @@ from ..models import (
 from ..models import CustomerTierHistory
 
 
+# Minimum total points for each tier, in ascending order
+TIER_THRESHOLDS = (
+    (0, CustomerTier.BRONZE),
+    (1000, CustomerTier.SILVER),
+    (5000, CustomerTier.GOLD),
+    (10000, CustomerTier.PLATINUM),
+)
+_TIER_MIN_POINTS = [min_points for min_points, _ in TIER_THRESHOLDS]
+_TIER_INDEX = {tier: i for i, (_, tier) in enumerate(TIER_THRESHOLDS)}
+
+# Hardcoded tier benefits, built once rather than on every lookup
+TIER_BENEFITS = {
+    CustomerTier.BRONZE: [
+        {"type": "points_multiplier", "value": "1x", "description": "Standard points earning rate"},
+        {"type": "discount", "value": "5%", "description": "Base discount on all purchases"}
+    ],
+    CustomerTier.SILVER: [
+        {"type": "points_multiplier", "value": "1.5x", "description": "50% bonus points on all purchases"},
+        {"type": "discount", "value": "10%", "description": "Enhanced discount on all purchases"},
+        {"type": "priority_support", "value": "Standard", "description": "Priority customer support"}
+    ],
+    CustomerTier.GOLD: [
+        {"type": "points_multiplier", "value": "2x", "description": "Double points on all purchases"},
+        {"type": "discount", "value": "15%", "description": "Premium discount on all purchases"},
+        {"type": "priority_support", "value": "Premium", "description": "Premium customer support"},
+        {"type": "free_shipping", "value": "All orders", "description": "Free shipping on all orders"}
+    ],
+    CustomerTier.PLATINUM: [
+        {"type": "points_multiplier", "value": "3x", "description": "Triple points on all purchases"},
+        {"type": "discount", "value": "20%", "description": "VIP discount on all purchases"},
+        {"type": "priority_support", "value": "VIP", "description": "VIP customer support"},
+        {"type": "free_shipping", "value": "All orders", "description": "Free shipping on all orders"},
+        {"type": "exclusive_access", "value": "Events", "description": "Access to exclusive events"}
+    ]
+}
+
+
+def tier_for_points(points: int) -> CustomerTier:
+    """Get the highest tier whose threshold the points balance reaches."""
+    return TIER_THRESHOLDS[max(0, bisect_right(_TIER_MIN_POINTS, points) - 1)][1]
+
+
 class LoyaltyService:
     """
     Service for handling loyalty program operations.
@@ -33,13 +76,23 @@ class LoyaltyService:
         if points <= 0:
             raise ValueError("Points must be positive")
 
-        customer = self.db.query(Customer).filter(Customer.id == customer_id).first()
-        if not customer:
+        # Credit the balance in one round-trip and read back what the tier check needs
+        row = self.db.execute(
+            update(Customer)
+            .where(Customer.id == customer_id)
+            .values(
+                total_points=Customer.total_points + points,
+                lifetime_points=Customer.lifetime_points + points,
+                last_activity=datetime.utcnow()
+            )
+            .returning(Customer.user_id, Customer.total_points, Customer.tier)
+        ).one_or_none()
+        if row is None:
             raise ValueError("Customer not found")
 
         # Create transaction record
         transaction = LoyaltyTransaction(
-            user_id=user_id or customer.user_id,
+            user_id=user_id or row.user_id,
             customer_id=customer_id,
             points=points,
             transaction_type=TransactionType.EARNED,
@@ -52,19 +105,12 @@ class LoyaltyService:
 
         self.db.add(transaction)
 
-        # Update customer points and check for tier upgrades
-        customer.total_points += points
-        customer.lifetime_points += points
+        # Check for automatic tier upgrades; the customer row is only loaded when one applies
+        new_tier = tier_for_points(row.total_points)
+        if _TIER_INDEX[new_tier] > _TIER_INDEX[row.tier]:
+            customer = self.db.get(Customer, customer_id)
+            self._upgrade_customer_tier(customer, new_tier, "Automatic upgrade based on points")
 
-        # Check for automatic tier upgrades
-        if customer.tier == CustomerTier.BRONZE and customer.total_points >= 1000:
-            self._upgrade_customer_tier(customer, CustomerTier.SILVER, "Automatic upgrade based on points")
-        elif customer.tier == CustomerTier.SILVER and customer.total_points >= 5000:
-            self._upgrade_customer_tier(customer, CustomerTier.GOLD, "Automatic upgrade based on points")
-        elif customer.tier == CustomerTier.GOLD and customer.total_points >= 10000:
-            self._upgrade_customer_tier(customer, CustomerTier.PLATINUM, "Automatic upgrade based on points")
-
-        customer.last_activity = datetime.utcnow()
         self.db.commit()
         self.db.refresh(transaction)
 
@@ -279,33 +325,7 @@ class LoyaltyService:
     def get_tier_benefits(self, tier: CustomerTier) -> List[Dict[str, Any]]:
         """Get benefits for a specific tier."""
         # This would typically fetch from tier_benefits table
-        # For now, return hardcoded benefits
-        benefits = {
-            CustomerTier.BRONZE: [
-                {"type": "points_multiplier", "value": "1x", "description": "Standard points earning rate"},
-                {"type": "discount", "value": "5%", "description": "Base discount on all purchases"}
-            ],
-            CustomerTier.SILVER: [
-                {"type": "points_multiplier", "value": "1.5x", "description": "50% bonus points on all purchases"},
-                {"type": "discount", "value": "10%", "description": "Enhanced discount on all purchases"},
-                {"type": "priority_support", "value": "Standard", "description": "Priority customer support"}
-            ],
-            CustomerTier.GOLD: [
-                {"type": "points_multiplier", "value": "2x", "description": "Double points on all purchases"},
-                {"type": "discount", "value": "15%", "description": "Premium discount on all purchases"},
-                {"type": "priority_support", "value": "Premium", "description": "Premium customer support"},
-                {"type": "free_shipping", "value": "All orders", "description": "Free shipping on all orders"}
-            ],
-            CustomerTier.PLATINUM: [
-                {"type": "points_multiplier", "value": "3x", "description": "Triple points on all purchases"},
-                {"type": "discount", "value": "20%", "description": "VIP discount on all purchases"},
-                {"type": "priority_support", "value": "VIP", "description": "VIP customer support"},
-                {"type": "free_shipping", "value": "All orders", "description": "Free shipping on all orders"},
-                {"type": "exclusive_access", "value": "Events", "description": "Access to exclusive events"}
-            ]
-        }
-
-        return benefits.get(tier, [])
+        return TIER_BENEFITS.get(tier, [])
 
     def get_tier_requirements(self) -> Dict[str, Any]:
         """Get requirements for each tier."""
@@ -336,62 +356,50 @@ class LoyaltyService:
 
     def _get_next_tier(self, current_tier: CustomerTier) -> Optional[CustomerTier]:
         """Get next tier for a customer."""
-        tier_order = {
-            CustomerTier.BRONZE: CustomerTier.SILVER,
-            CustomerTier.SILVER: CustomerTier.GOLD,
-            CustomerTier.GOLD: CustomerTier.PLATINUM,
-            CustomerTier.PLATINUM: None
-        }
-
-        return tier_order.get(current_tier)
+        index = _TIER_INDEX[current_tier] + 1
+        return TIER_THRESHOLDS[index][1] if index < len(TIER_THRESHOLDS) else None
 
     def _get_points_to_next_tier(self, current_points: int, current_tier: CustomerTier) -> Optional[int]:
         """Get points needed to reach next tier."""
-        tier_thresholds = {
-            CustomerTier.BRONZE: 1000,
-            CustomerTier.SILVER: 5000,
-            CustomerTier.GOLD: 10000,
-            CustomerTier.PLATINUM: None
-        }
-
-        next_tier_threshold = tier_thresholds.get(self._get_next_tier(current_tier))
-
-        if next_tier_threshold is None:
+        index = _TIER_INDEX[current_tier] + 1
+        if index >= len(TIER_THRESHOLDS):
             return None
 
-        return max(0, next_tier_threshold - current_points)
+        return max(0, _TIER_MIN_POINTS[index] - current_points)
 
     def get_loyalty_analytics(self, start_date: Optional[datetime] = None,
                              end_date: Optional[datetime] = None) -> Dict[str, Any]:
         """Get loyalty program analytics."""
-        query = self.db.query(LoyaltyTransaction)
+        # One grouped pass over the window instead of a count per type and source
+        query = self.db.query(
+            LoyaltyTransaction.transaction_type,
+            LoyaltyTransaction.source,
+            func.count(LoyaltyTransaction.id),
+            func.sum(case((LoyaltyTransaction.points > 0, LoyaltyTransaction.points), else_=0)),
+            func.sum(case((LoyaltyTransaction.points < 0, -LoyaltyTransaction.points), else_=0))
+        )
 
         if start_date:
             query = query.filter(LoyaltyTransaction.created_at >= start_date)
         if end_date:
             query = query.filter(LoyaltyTransaction.created_at <= end_date)
 
-        # Get basic statistics
-        total_transactions = query.count()
-        total_points_earned = query.filter(LoyaltyTransaction.points > 0).with_entities(func.sum(LoyaltyTransaction.points)).scalar() or 0
-        total_points_spent = abs(query.filter(LoyaltyTransaction.points < 0).with_entities(func.sum(LoyaltyTransaction.points)).scalar() or 0)
-
-        # Get transaction type breakdown
-        type_breakdown = {}
-        for transaction_type in TransactionType:
-            count = query.filter(LoyaltyTransaction.transaction_type == transaction_type).count()
-            type_breakdown[transaction_type.value] = count
+        type_breakdown = {transaction_type.value: 0 for transaction_type in TransactionType}
+        source_breakdown = {source.value: 0 for source in TransactionSource}
+        total_transactions = total_points_earned = total_points_spent = 0
 
-        # Get source breakdown
-        source_breakdown = {}
-        for source in TransactionSource:
-            count = query.filter(LoyaltyTransaction.source == source).count()
-            source_breakdown[source.value] = count
+        for transaction_type, source, count, earned, spent in query.group_by(
+            LoyaltyTransaction.transaction_type, LoyaltyTransaction.source
+        ):
+            type_breakdown[transaction_type.value] += count
+            source_breakdown[source.value] += count
+            total_transactions += count
+            total_points_earned += earned or 0
+            total_points_spent += spent or 0
 
         # Get tier distribution
-        tier_distribution = {}
-        for tier in CustomerTier:
-            count = self.db.query(Customer).filter(Customer.tier == tier).count()
+        tier_distribution = {tier.value: 0 for tier in CustomerTier}
+        for tier, count in self.db.query(Customer.tier, func.count(Customer.id)).group_by(Customer.tier):
             tier_distribution[tier.value] = count
 
         return {
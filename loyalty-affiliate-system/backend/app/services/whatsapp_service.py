@@ -5,19 +5,84 @@ Handles WhatsApp messaging, templates, delivery tracking,
 and WhatsApp Business API integration.
 """
 
+import hashlib
+import logging
+import re
+from dataclasses import dataclass
 from datetime import datetime, timedelta
-from typing import Optional, Dict, Any, List
-from sqlalchemy.orm import Session
-from sqlalchemy import func, and_
-import requests
-import json
-
+from threading import Lock
+from typing import Optional, Dict, Any, List, Tuple, Union
+from sqlalchemy.orm import Session, joinedload, load_only, raiseload, selectinload
+from sqlalchemy import func, and_, insert, update
+from cachetools import TTLCache
+import orjson
+import redis
+
+from ..core.config import settings
+from ..core.celery_app import celery_app
+from . import _whatsapp_http
 from ..models import (
     WhatsAppMessage, NotificationTemplate, WhatsAppWebhook,
     Customer, User, MessageType, MessageDirection,
     MessageStatus, TemplateCategory
 )
 
+logger = logging.getLogger(__name__)
+
+# Characters stripped from phone numbers before they reach the WhatsApp API
+_PHONE_STRIP = str.maketrans('', '', '+ -')
+
+# Media message types that are sent by link rather than as a text body
+_MEDIA_TYPES = {MessageType.IMAGE, MessageType.DOCUMENT, MessageType.AUDIO, MessageType.VIDEO}
+
+# Timestamp column stamped alongside each status transition
+_STATUS_TIMESTAMP_COLUMNS = {
+    MessageStatus.SENT: WhatsAppMessage.sent_at,
+    MessageStatus.DELIVERED: WhatsAppMessage.delivered_at,
+    MessageStatus.READ: WhatsAppMessage.read_at
+}
+
+# WhatsApp redelivers webhooks at least once; remember seen payloads this long (seconds)
+_WEBHOOK_DEDUPE_TTL = 7200
+
+# Connects lazily on first use
+_redis_client = redis.Redis.from_url(settings.REDIS_URL)
+
+# A message still SENDING after this long lost its send task and is handed back to the scheduler
+SENDING_CLAIM_TIMEOUT = timedelta(minutes=15)
+
+# Inbound webhook rows are inserted in executemany batches of this size
+_INBOUND_INSERT_BATCH = 500
+
+# Fixed part of every text message payload; only recipient and body vary
+_TEXT_PAYLOAD_TEMPLATE = {"messaging_product": "whatsapp", "type": "text"}
+
+# A {{variable}} placeholder; WhatsApp templates also use numeric ones such as {{1}}
+_PLACEHOLDER = re.compile(r"\{\{(\w+)\}\}")
+
+
+def _render_template(content: str, variables: Dict[str, Any]) -> str:
+    """Substitute {{variable}} placeholders, leaving unknown ones as written."""
+    return _PLACEHOLDER.sub(
+        lambda match: str(variables[match[1]]) if match[1] in variables else match[0],
+        content
+    )
+
+
+@dataclass(frozen=True)
+class TemplateData:
+    """Read-only snapshot of the template fields needed to send a message."""
+    id: int
+    content: str
+    variables: Tuple[str, ...]
+    media_url: Optional[str]
+    category: TemplateCategory
+
+
+# Templates change rarely, so sends read them from a process-wide TTL cache
+_template_cache: TTLCache = TTLCache(maxsize=1024, ttl=600)
+_template_cache_lock = Lock()
+
 
 class WhatsAppService:
     """
@@ -40,8 +105,10 @@ class WhatsAppService:
             content=content,
             media_url=media_url,
             template_id=template_id,
-            recipient_phone=recipient_phone,
-            status=MessageStatus.PENDING,
+            recipient_phone=recipient_phone.translate(_PHONE_STRIP),
+            # Handed to a worker right away, so the scheduler must not claim it again
+            status=MessageStatus.SENDING,
+            status_timestamp=datetime.utcnow(),
             is_automated=is_automated,
             scheduled_for=datetime.utcnow()
         )
@@ -50,26 +117,40 @@ class WhatsAppService:
         self.db.commit()
         self.db.refresh(message)
 
-        # In a real implementation, you would send the message to WhatsApp API here
-        # For now, we'll simulate sending
-        self._simulate_message_send(message.id)
+        # Hand the API call to a worker so the request returns immediately
+        try:
+            celery_app.send_task("whatsapp.send_message", args=[message.id])
+        except Exception:
+            # The message is already due, so the scheduler picks it up on its next tick
+            self._release_claims([message.id])
+            self.db.refresh(message)
 
         return message
 
+    def dispatch_message(self, message_id: int) -> None:
+        """Deliver a stored outbound message; called from the send worker."""
+        message = self.get_message_by_id(message_id)
+
+        if not message:
+            raise ValueError("Message not found")
+
+        if settings.WHATSAPP_ACCESS_TOKEN:
+            self._deliver_message(message)
+        else:
+            # Without API credentials, simulate sending
+            self._simulate_message_send(message.id)
+
     def send_template_message(self, recipient_phone: str, template_id: int,
                              variables: Optional[Dict] = None, user_id: Optional[int] = None,
                              customer_id: Optional[int] = None) -> WhatsAppMessage:
         """Send a WhatsApp template message."""
-        template = self.get_template_by_id(template_id)
+        template = self._get_template_cached(template_id)
 
         if not template:
             raise ValueError("Template not found")
 
-        # Replace variables in template content
-        content = template.content
-        if variables:
-            for key, value in variables.items():
-                content = content.replace(f"{{{{{key}}}}}", str(value))
+        # Substitute every variable in a single pass over the precompiled pattern
+        content = _render_template(template.content, variables or {})
 
         return self.send_message(
             recipient_phone=recipient_phone,
@@ -99,7 +180,7 @@ class WhatsAppService:
             category=category,
             message_type=message_type,
             content=content,
-            variables=json.dumps(variables) if variables else None,
+            variables=variables or None,
             media_url=media_url,
             is_active=True,
             is_default=False,
@@ -110,6 +191,7 @@ class WhatsAppService:
         self.db.add(template)
         self.db.commit()
         self.db.refresh(template)
+        self._invalidate_template(template.id)
 
         return template
 
@@ -126,9 +208,43 @@ class WhatsAppService:
             )
         ).all()
 
+    def get_available_templates(self, category: Optional[TemplateCategory] = None) -> List[Dict[str, Any]]:
+        """Get active templates, optionally filtered by category."""
+        query = self.db.query(NotificationTemplate).filter(
+            NotificationTemplate.is_active == True
+        )
+
+        if category:
+            query = query.filter(NotificationTemplate.category == category)
+
+        return [
+            {
+                "id": t.id,
+                "name": t.name,
+                "category": t.category.value,
+                "message_type": t.message_type.value,
+                "content": t.content,
+                "variables": t.variables or [],
+                "media_url": t.media_url,
+                "usage_count": t.usage_count,
+                "last_used": t.last_used.isoformat() if t.last_used else None
+            }
+            for t in query.order_by(NotificationTemplate.name).all()
+        ]
+
     def get_all_templates(self) -> List[NotificationTemplate]:
         """Get all active templates."""
-        return self.db.query(NotificationTemplate).filter(
+        # Listing callers need identifying fields only; content and variables stay deferred
+        return self.db.query(NotificationTemplate).options(
+            load_only(
+                NotificationTemplate.id,
+                NotificationTemplate.name,
+                NotificationTemplate.category,
+                NotificationTemplate.message_type,
+                NotificationTemplate.is_active,
+                NotificationTemplate.usage_count
+            )
+        ).filter(
             NotificationTemplate.is_active == True
         ).order_by(NotificationTemplate.name).all()
 
@@ -144,69 +260,182 @@ class WhatsAppService:
 
         self.db.commit()
         self.db.refresh(template)
+        self._invalidate_template(template_id)
 
         return template
 
-    def process_webhook(self, webhook_data: Dict) -> WhatsAppWebhook:
-        """Process a WhatsApp webhook."""
-        webhook = WhatsAppWebhook(
-            webhook_id=webhook_data.get("id", ""),
-            event_type=webhook_data.get("event_type", ""),
-            payload=json.dumps(webhook_data),
-            processed=False
+    def _get_template_cached(self, template_id: int) -> Optional[TemplateData]:
+        """Get a template snapshot for sending, loading it on a cache miss."""
+        with _template_cache_lock:
+            data = _template_cache.get(template_id)
+        if data is not None:
+            return data
+
+        template = self.get_template_by_id(template_id)
+        if not template:
+            return None
+
+        data = TemplateData(
+            id=template.id,
+            content=template.content,
+            variables=tuple(template.variables or ()),
+            media_url=template.media_url,
+            category=template.category
         )
+        with _template_cache_lock:
+            _template_cache[template_id] = data
+        return data
+
+    def _invalidate_template(self, template_id: int) -> None:
+        """Drop a template from the send cache after it changes."""
+        with _template_cache_lock:
+            _template_cache.pop(template_id, None)
+
+    def enqueue_webhook(self, raw_body: bytes) -> None:
+        """Queue a raw WhatsApp webhook body for processing by a background worker."""
+        # Reject bodies the worker could never store (bad UTF-8, bad JSON, not an object);
+        # orjson's decode error is a ValueError
+        if not isinstance(orjson.loads(raw_body), dict):
+            raise ValueError("Webhook payload must be a JSON object")
+
+        celery_app.send_task("whatsapp.process_webhook", args=[raw_body.decode("utf-8")])
+
+    def process_webhook(self, raw_body: Union[bytes, str]) -> Optional[WhatsAppWebhook]:
+        """Process a WhatsApp webhook; returns None for a redelivered duplicate."""
+        webhook_data = orjson.loads(raw_body)
+        get = webhook_data.get
+
+        dedupe_key = self._webhook_dedupe_key(webhook_data)
+        if self._is_duplicate_webhook(dedupe_key):
+            return None
+
+        try:
+            webhook = WhatsAppWebhook(
+                webhook_id=get("id", ""),
+                event_type=get("event_type", ""),
+                payload=raw_body if isinstance(raw_body, str) else raw_body.decode("utf-8"),
+                processed=False
+            )
 
-        self.db.add(webhook)
-        self.db.commit()
-        self.db.refresh(webhook)
+            self.db.add(webhook)
+            self.db.commit()
+            self.db.refresh(webhook)
 
-        # Process the webhook asynchronously
-        self._process_webhook_async(webhook.id)
+            self._process_webhook(webhook, webhook_data)
+        except Exception:
+            # Let the provider's redelivery through instead of dropping the event as a duplicate
+            self._release_webhook(dedupe_key)
+            raise
 
         return webhook
 
+    def _webhook_dedupe_key(self, webhook_data: Dict) -> str:
+        """Build the Redis key that marks a webhook payload as seen."""
+        digest = hashlib.md5(orjson.dumps(webhook_data, option=orjson.OPT_SORT_KEYS)).hexdigest()
+        return f"wh:{digest}"
+
+    def _is_duplicate_webhook(self, dedupe_key: str) -> bool:
+        """Check whether an identical webhook payload was seen recently, marking it seen if not."""
+        try:
+            # SET NX returns None when the key already exists
+            return _redis_client.set(dedupe_key, 1, nx=True, ex=_WEBHOOK_DEDUPE_TTL) is None
+        except redis.RedisError:
+            # Fail open: a duplicate row is better than a dropped webhook
+            return False
+
+    def _release_webhook(self, dedupe_key: str) -> None:
+        """Forget a webhook payload whose processing failed."""
+        try:
+            _redis_client.delete(dedupe_key)
+        except redis.RedisError:
+            pass
+
     def get_message_history(self, customer_id: Optional[int] = None,
-                           user_id: Optional[int] = None, limit: int = 50) -> List[WhatsAppMessage]:
-        """Get WhatsApp message history."""
-        query = self.db.query(WhatsAppMessage)
+                           user_id: Optional[int] = None, limit: int = 50, offset: int = 0,
+                           direction: Optional[MessageDirection] = None) -> Dict[str, Any]:
+        """Get paginated WhatsApp message history."""
+        # Select plain columns so rows come back as tuples without ORM hydration
+        query = self.db.query(
+            WhatsAppMessage.id,
+            WhatsAppMessage.message_type,
+            WhatsAppMessage.direction,
+            WhatsAppMessage.content,
+            WhatsAppMessage.media_url,
+            WhatsAppMessage.status,
+            WhatsAppMessage.sent_at,
+            WhatsAppMessage.delivered_at,
+            WhatsAppMessage.read_at,
+            WhatsAppMessage.error_message,
+            WhatsAppMessage.created_at
+        )
 
         if customer_id:
             query = query.filter(WhatsAppMessage.customer_id == customer_id)
         if user_id:
             query = query.filter(WhatsAppMessage.user_id == user_id)
+        if direction:
+            query = query.filter(WhatsAppMessage.direction == direction)
 
-        return query.order_by(WhatsAppMessage.created_at.desc()).limit(limit).all()
+        total = query.count()
+        rows = query.order_by(WhatsAppMessage.created_at.desc()).offset(offset).limit(limit).all()
+
+        return {
+            "messages": [
+                {
+                    "id": row.id,
+                    "message_type": row.message_type.value,
+                    "direction": row.direction.value,
+                    "content": row.content,
+                    "media_url": row.media_url,
+                    "status": row.status.value,
+                    "sent_at": row.sent_at.isoformat() if row.sent_at else None,
+                    "delivered_at": row.delivered_at.isoformat() if row.delivered_at else None,
+                    "read_at": row.read_at.isoformat() if row.read_at else None,
+                    "error_message": row.error_message,
+                    "created_at": row.created_at.isoformat() if row.created_at else None
+                }
+                for row in rows
+            ],
+            "pagination": {
+                "total": total,
+                "limit": limit,
+                "offset": offset
+            }
+        }
 
     def get_message_by_id(self, message_id: int) -> Optional[WhatsAppMessage]:
         """Get message by ID."""
-        return self.db.query(WhatsAppMessage).filter(WhatsAppMessage.id == message_id).first()
+        # Callers only touch columns; fail loudly rather than lazy-load relationships
+        return self.db.query(WhatsAppMessage).options(
+            raiseload("*")
+        ).filter(WhatsAppMessage.id == message_id).first()
 
     def update_message_status(self, message_id: int, status: MessageStatus,
                              status_timestamp: Optional[datetime] = None) -> WhatsAppMessage:
         """Update message delivery status."""
-        message = self.get_message_by_id(message_id)
-
-        if not message:
+        # One UPDATE ... RETURNING replaces the fetch, mutate, commit and refresh round-trips
+        message = self.db.execute(
+            update(WhatsAppMessage)
+            .where(WhatsAppMessage.id == message_id)
+            .values(self._status_values(status, status_timestamp))
+            .returning(WhatsAppMessage)
+        ).scalar_one_or_none()
+
+        if message is None:
             raise ValueError("Message not found")
 
-        message.status = status
-        if status_timestamp:
-            message.status_timestamp = status_timestamp
-        else:
-            message.status_timestamp = datetime.utcnow()
+        self.db.commit()
 
-        # Update specific timestamp fields based on status
-        if status == MessageStatus.SENT:
-            message.sent_at = message.status_timestamp
-        elif status == MessageStatus.DELIVERED:
-            message.delivered_at = message.status_timestamp
-        elif status == MessageStatus.READ:
-            message.read_at = message.status_timestamp
+        return message
 
+    def mark_message_status(self, message_id: int, status: MessageStatus) -> bool:
+        """Set a message's status with one targeted UPDATE; returns False if it is gone."""
+        updated = self.db.query(WhatsAppMessage).filter(
+            WhatsAppMessage.id == message_id
+        ).update(self._status_values(status), synchronize_session=False)
         self.db.commit()
-        self.db.refresh(message)
 
-        return message
+        return updated > 0
 
     def schedule_message(self, recipient_phone: str, message_type: MessageType,
                         content: str, scheduled_time: datetime, user_id: Optional[int] = None,
@@ -221,7 +450,7 @@ class WhatsAppService:
             content=content,
             media_url=media_url,
             template_id=template_id,
-            recipient_phone=recipient_phone,
+            recipient_phone=recipient_phone.translate(_PHONE_STRIP),
             status=MessageStatus.PENDING,
             is_automated=False,
             scheduled_for=scheduled_time
@@ -237,72 +466,155 @@ class WhatsAppService:
         """Get messages scheduled for sending."""
         now = datetime.utcnow()
 
-        return self.db.query(WhatsAppMessage).filter(
+        return self.db.query(WhatsAppMessage).options(
+            selectinload(WhatsAppMessage.template),
+            raiseload("*")
+        ).filter(
             and_(
                 WhatsAppMessage.status == MessageStatus.PENDING,
                 WhatsAppMessage.scheduled_for <= now
             )
         ).all()
 
+    def claim_scheduled_messages(self, batch_size: int = 500) -> List[int]:
+        """Claim due scheduled messages and queue them for sending."""
+        now = datetime.utcnow()
+
+        # SKIP LOCKED lets concurrent scheduler ticks claim disjoint batches
+        message_ids = [
+            message_id for (message_id,) in self.db.query(WhatsAppMessage.id).filter(
+                and_(
+                    WhatsAppMessage.status == MessageStatus.PENDING,
+                    WhatsAppMessage.scheduled_for <= now
+                )
+            ).order_by(
+                WhatsAppMessage.scheduled_for
+            ).limit(batch_size).with_for_update(skip_locked=True)
+        ]
+
+        if not message_ids:
+            return []
+
+        # Flip the whole batch in one UPDATE and one commit
+        self.db.query(WhatsAppMessage).filter(
+            WhatsAppMessage.id.in_(message_ids)
+        ).update(
+            {
+                WhatsAppMessage.status: MessageStatus.SENDING,
+                WhatsAppMessage.status_timestamp: now
+            },
+            synchronize_session=False
+        )
+        self.db.commit()
+
+        for index, message_id in enumerate(message_ids):
+            try:
+                celery_app.send_task("whatsapp.send_message", args=[message_id])
+            except Exception:
+                # Hand back every claim that never reached the broker
+                self._release_claims(message_ids[index:])
+                raise
+
+        return message_ids
+
+    def requeue_stale_sending(self, timeout: timedelta = SENDING_CLAIM_TIMEOUT) -> int:
+        """Hand messages stuck in SENDING past the timeout back to the scheduler."""
+        cutoff = datetime.utcnow() - timeout
+
+        requeued = self.db.query(WhatsAppMessage).filter(
+            WhatsAppMessage.status == MessageStatus.SENDING,
+            func.coalesce(WhatsAppMessage.status_timestamp, WhatsAppMessage.created_at) < cutoff
+        ).update(
+            {
+                WhatsAppMessage.status: MessageStatus.PENDING,
+                WhatsAppMessage.status_timestamp: datetime.utcnow()
+            },
+            synchronize_session=False
+        )
+        self.db.commit()
+
+        return requeued
+
+    def _release_claims(self, message_ids: List[int]) -> None:
+        """Return claimed messages to PENDING after their send task could not be queued."""
+        self.db.query(WhatsAppMessage).filter(
+            WhatsAppMessage.id.in_(message_ids),
+            WhatsAppMessage.status == MessageStatus.SENDING
+        ).update(
+            {
+                WhatsAppMessage.status: MessageStatus.PENDING,
+                WhatsAppMessage.status_timestamp: datetime.utcnow()
+            },
+            synchronize_session=False
+        )
+        self.db.commit()
+
     def get_message_analytics(self, start_date: Optional[datetime] = None,
                              end_date: Optional[datetime] = None) -> Dict[str, Any]:
         """Get WhatsApp message analytics."""
-        query = self.db.query(WhatsAppMessage)
-
+        filters = []
         if start_date:
-            query = query.filter(WhatsAppMessage.created_at >= start_date)
+            filters.append(WhatsAppMessage.created_at >= start_date)
         if end_date:
-            query = query.filter(WhatsAppMessage.created_at <= end_date)
+            filters.append(WhatsAppMessage.created_at <= end_date)
+
+        def count_by(column):
+            return dict(
+                self.db.query(column, func.count(WhatsAppMessage.id))
+                .filter(*filters)
+                .group_by(column)
+                .all()
+            )
 
-        total_sent = query.filter(WhatsAppMessage.direction == MessageDirection.OUTBOUND).count()
+        # One grouped aggregate per breakdown; enum members with no rows default to 0
+        status_counts = count_by(WhatsAppMessage.status)
+        status_breakdown = {status.value: status_counts.get(status, 0) for status in MessageStatus}
 
-        # Status breakdown
-        status_breakdown = {}
-        for status in MessageStatus:
-            count = query.filter(WhatsAppMessage.status == status).count()
-            status_breakdown[status.value] = count
+        type_counts = count_by(WhatsAppMessage.message_type)
+        type_breakdown = {msg_type.value: type_counts.get(msg_type, 0) for msg_type in MessageType}
 
-        # Type breakdown
-        type_breakdown = {}
-        for msg_type in MessageType:
-            count = query.filter(WhatsAppMessage.message_type == msg_type).count()
-            type_breakdown[msg_type.value] = count
+        # Direction totals and delivery/read rates come from one filtered aggregate
+        outbound = func.count(WhatsAppMessage.id).filter(
+            WhatsAppMessage.direction == MessageDirection.OUTBOUND
+        )
+        inbound = func.count(WhatsAppMessage.id).filter(
+            WhatsAppMessage.direction == MessageDirection.INBOUND
+        )
+        delivered = func.count(WhatsAppMessage.id).filter(
+            WhatsAppMessage.status.in_([MessageStatus.DELIVERED, MessageStatus.READ])
+        )
+        read = func.count(WhatsAppMessage.id).filter(WhatsAppMessage.status == MessageStatus.READ)
+
+        totals = self.db.query(
+            outbound.label("total_sent"),
+            inbound.label("inbound"),
+            func.coalesce(delivered * 100.0 / func.nullif(outbound, 0), 0).label("delivery_rate"),
+            func.coalesce(read * 100.0 / func.nullif(delivered, 0), 0).label("read_rate")
+        ).filter(*filters).one()
 
         # Response rate (simplified calculation)
-        outbound_messages = query.filter(WhatsAppMessage.direction == MessageDirection.OUTBOUND).all()
-        inbound_count = query.filter(WhatsAppMessage.direction == MessageDirection.INBOUND).count()
-        response_rate = (inbound_count / max(len(outbound_messages), 1)) * 100
+        response_rate = (totals.inbound / max(totals.total_sent, 1)) * 100
 
         return {
-            "total_sent": total_sent,
+            "total_sent": totals.total_sent,
             "status_breakdown": status_breakdown,
             "type_breakdown": type_breakdown,
             "response_rate": round(response_rate, 2),
-            "delivery_rate": self._calculate_delivery_rate(status_breakdown, total_sent),
-            "read_rate": self._calculate_read_rate(status_breakdown)
+            "delivery_rate": float(totals.delivery_rate),
+            "read_rate": float(totals.read_rate)
         }
 
-    def send_birthday_message(self, customer_id: int, template_id: Optional[int] = None) -> WhatsAppMessage:
+    def send_birthday_message(self, customer_id: int, template_id: Optional[int] = None,
+                              customer: Optional[Customer] = None,
+                              now: Optional[datetime] = None) -> WhatsAppMessage:
         """Send birthday message to customer."""
-        customer = self.db.query(Customer).filter(Customer.id == customer_id).first()
-
-        if not customer:
-            raise ValueError("Customer not found")
-
-        # Get customer phone from associated user
-        user = self.db.query(User).filter(User.id == customer.user_id).first()
-        if not user:
-            raise ValueError("User not found")
+        customer, user = self._get_customer_and_user(customer_id, customer)
+        # Batch callers pass one snapshot so every greeting in a run shares it
+        now = now or datetime.utcnow()
 
         # Use default birthday template if none specified
         if not template_id:
-            template = self.db.query(NotificationTemplate).filter(
-                and_(
-                    NotificationTemplate.category == TemplateCategory.BIRTHDAY,
-                    NotificationTemplate.is_default == True,
-                    NotificationTemplate.is_active == True
-                )
-            ).first()
+            template = self._get_default_template(TemplateCategory.BIRTHDAY)
 
             if template:
                 template_id = template.id
@@ -315,30 +627,18 @@ class WhatsAppService:
             template_id=template_id,
             variables={
                 "customer_name": user.name,
-                "birthday_date": datetime.now().strftime("%B %d")
+                "birthday_date": now.strftime("%B %d")
             },
             customer_id=customer_id
         )
 
-    def send_welcome_message(self, customer_id: int) -> WhatsAppMessage:
+    def send_welcome_message(self, customer_id: int,
+                             customer: Optional[Customer] = None) -> WhatsAppMessage:
         """Send welcome message to new customer."""
-        customer = self.db.query(Customer).filter(Customer.id == customer_id).first()
-
-        if not customer:
-            raise ValueError("Customer not found")
-
-        user = self.db.query(User).filter(User.id == customer.user_id).first()
-        if not user:
-            raise ValueError("User not found")
+        customer, user = self._get_customer_and_user(customer_id, customer)
 
         # Get welcome template
-        template = self.db.query(NotificationTemplate).filter(
-            and_(
-                NotificationTemplate.category == TemplateCategory.WELCOME,
-                NotificationTemplate.is_default == True,
-                NotificationTemplate.is_active == True
-            )
-        ).first()
+        template = self._get_default_template(TemplateCategory.WELCOME)
 
         if not template:
             raise ValueError("No welcome template available")
@@ -353,81 +653,153 @@ class WhatsAppService:
             customer_id=customer_id
         )
 
+    def _status_values(self, status: MessageStatus,
+                       status_timestamp: Optional[datetime] = None) -> Dict[Any, Any]:
+        """Build the column values for a status transition."""
+        timestamp = status_timestamp or datetime.utcnow()
+        values = {WhatsAppMessage.status: status, WhatsAppMessage.status_timestamp: timestamp}
+
+        # Update specific timestamp fields based on status
+        timestamp_column = _STATUS_TIMESTAMP_COLUMNS.get(status)
+        if timestamp_column is not None:
+            values[timestamp_column] = timestamp
+
+        return values
+
+    def _get_customer_and_user(self, customer_id: int,
+                               customer: Optional[Customer] = None) -> Tuple[Customer, User]:
+        """Resolve a customer and its user, reusing a customer already loaded by the caller."""
+        if customer is None:
+            # Fetch the user in the same round-trip instead of lazy-loading it afterwards
+            customer = self.db.query(Customer).options(
+                joinedload(Customer.user)
+            ).filter(Customer.id == customer_id).first()
+
+            if not customer:
+                raise ValueError("Customer not found")
+
+        # Get customer phone from associated user
+        user = customer.user
+        if not user:
+            raise ValueError("User not found")
+
+        return customer, user
+
+    def _get_default_template(self, category: TemplateCategory) -> Optional[NotificationTemplate]:
+        """Get the first active default template for a category."""
+        return self.db.query(NotificationTemplate).filter(
+            and_(
+                NotificationTemplate.category == category,
+                NotificationTemplate.is_default == True,
+                NotificationTemplate.is_active == True
+            )
+        ).order_by(NotificationTemplate.id).limit(1).first()
+
+    def _deliver_message(self, message: WhatsAppMessage) -> None:
+        """Send a stored message through the WhatsApp Business API."""
+        if message.message_type in _MEDIA_TYPES and message.media_url:
+            media_type = message.message_type.value
+            payload = {
+                "messaging_product": "whatsapp",
+                "to": message.recipient_phone,
+                "type": media_type,
+                media_type: {"link": message.media_url}
+            }
+        else:
+            payload = {
+                **_TEXT_PAYLOAD_TEMPLATE,
+                "to": message.recipient_phone,
+                "text": {"body": message.content}
+            }
+
+        # Transport errors propagate so the send task can retry them
+        response = _whatsapp_http.session.post(
+            f"{settings.WHATSAPP_API_URL}/{settings.WHATSAPP_PHONE_NUMBER_ID}/messages",
+            data=orjson.dumps(payload),
+            headers={
+                "Authorization": f"Bearer {settings.WHATSAPP_ACCESS_TOKEN}",
+                "Content-Type": "application/json"
+            },
+            timeout=_whatsapp_http.TIMEOUT
+        )
+        response.raise_for_status()
+
+        # The API accepted the message; an unreadable body must not leave it stuck in SENDING
+        try:
+            message.whatsapp_message_id = orjson.loads(response.content)["messages"][0]["id"]
+        except (ValueError, KeyError, IndexError, TypeError):
+            message.whatsapp_message_id = None
+        self.update_message_status(message.id, MessageStatus.SENT)
+
     def _simulate_message_send(self, message_id: int) -> None:
         """Simulate sending message to WhatsApp API."""
-        # In a real implementation, this would call the WhatsApp Business API
-        # For now, we'll just update the message status after a delay
-        import threading
-        import time
-
-        def update_message():
-            time.sleep(1)  # Simulate API call delay
-            message = self.get_message_by_id(message_id)
-
-            if message:
-                # Simulate successful delivery
-                self.update_message_status(message_id, MessageStatus.SENT)
-
-                # Simulate delivery after 2 seconds
-                time.sleep(2)
-                self.update_message_status(message_id, MessageStatus.DELIVERED)
-
-        # Run in background thread
-        thread = threading.Thread(target=update_message)
-        thread.daemon = True
-        thread.start()
-
-    def _process_webhook_async(self, webhook_id: int) -> None:
-        """Process webhook asynchronously."""
-        import threading
-
-        def process():
-            webhook = self.db.query(WhatsAppWebhook).filter(
-                WhatsAppWebhook.id == webhook_id
-            ).first()
-
-            if webhook and not webhook.processed:
-                try:
-                    # Process webhook data
-                    payload = json.loads(webhook.payload)
-
-                    # Handle different webhook events
-                    if webhook.event_type == "message":
-                        self._handle_message_webhook(payload)
-                    elif webhook.event_type == "status":
-                        self._handle_status_webhook(payload)
-
-                    webhook.processed = True
-                    webhook.processed_at = datetime.utcnow()
-                    self.db.commit()
-
-                except Exception as e:
-                    webhook.error_message = str(e)
-                    self.db.commit()
-
-        thread = threading.Thread(target=process)
-        thread.daemon = True
-        thread.start()
+        # Delayed status tasks stand in for the API round-trip; nothing blocks meanwhile
+        celery_app.send_task("whatsapp.mark_sent", args=[message_id], countdown=1)
+        celery_app.send_task("whatsapp.mark_delivered", args=[message_id], countdown=3)
+
+    def _process_webhook(self, webhook: WhatsAppWebhook, payload: Dict) -> None:
+        """Dispatch a stored webhook to its event handler."""
+        try:
+            # Handle different webhook events
+            if webhook.event_type == "message":
+                self._handle_message_webhook(payload)
+            elif webhook.event_type == "status":
+                self._handle_status_webhook(payload)
+
+            webhook.processed = True
+            webhook.processed_at = datetime.utcnow()
+            self.db.commit()
+
+        except Exception as e:
+            self.db.rollback()
+            webhook.error_message = str(e)
+            self.db.commit()
 
     def _handle_message_webhook(self, payload: Dict) -> None:
         """Handle incoming message webhook."""
-        # Extract message data from webhook payload
-        message_data = payload.get("message", {})
-
-        # Create inbound message record
-        message = WhatsAppMessage(
-            user_id=None,  # Will be determined based on phone number
-            customer_id=None,
-            message_type=MessageType.TEXT,  # Default to text
-            direction=MessageDirection.INBOUND,
-            content=message_data.get("text", {}).get("body", ""),
-            recipient_phone=payload.get("to", ""),
-            status=MessageStatus.DELIVERED,
-            is_automated=False,
-            whatsapp_message_id=payload.get("id")
-        )
-
-        self.db.add(message)
+        # A payload carries either a single message or a batch under "messages"
+        entries = payload.get("messages") or [payload]
+
+        # Resolve every distinct sender to its user and customer in one query
+        senders = {entry["from"] for entry in entries if entry.get("from")}
+        owners = {}
+        if senders:
+            owners = {
+                phone: (user_id, customer_id)
+                for phone, user_id, customer_id in self.db.query(
+                    User.phone, User.id, Customer.id
+                ).outerjoin(
+                    Customer, Customer.user_id == User.id
+                ).filter(User.phone.in_(senders))
+            }
+
+        # Create inbound message records, stamped with one receipt time per batch
+        received_at = datetime.utcnow()
+        rows = []
+        for entry in entries:
+            get = entry.get
+            user_id, customer_id = owners.get(get("from"), (None, None))
+            if user_id is None:
+                # user_id is NOT NULL; one unknown sender must not sink the rest of the batch
+                logger.warning(f"Skipping inbound WhatsApp message {get('id')} from unknown sender {get('from')}")
+                continue
+            rows.append({
+                "user_id": user_id,
+                "customer_id": customer_id,
+                "message_type": MessageType.TEXT,  # Default to text
+                "direction": MessageDirection.INBOUND,
+                "content": ((get("message") or {}).get("text") or {}).get("body", ""),
+                "recipient_phone": get("to", ""),
+                "status": MessageStatus.DELIVERED,
+                "status_timestamp": received_at,
+                "delivered_at": received_at,
+                "is_automated": False,
+                "whatsapp_message_id": get("id")
+            })
+
+        # Core executemany inserts skip the identity map; one commit covers every batch
+        for start in range(0, len(rows), _INBOUND_INSERT_BATCH):
+            self.db.execute(insert(WhatsAppMessage), rows[start:start + _INBOUND_INSERT_BATCH])
         self.db.commit()
 
     def _handle_status_webhook(self, payload: Dict) -> None:
@@ -437,29 +809,10 @@ class WhatsAppService:
         status = payload.get("status")
 
         if message_id and status:
-            # Find message by WhatsApp message ID
-            message = self.db.query(WhatsAppMessage).filter(
+            # Update by WhatsApp message ID in one statement; unknown IDs match no rows
+            self.db.query(WhatsAppMessage).filter(
                 WhatsAppMessage.whatsapp_message_id == message_id
-            ).first()
-
-            if message:
-                message_status = MessageStatus(status.lower())
-                self.update_message_status(message.id, message_status)
-
-    def _calculate_delivery_rate(self, status_breakdown: Dict, total_sent: int) -> float:
-        """Calculate message delivery rate."""
-        if total_sent == 0:
-            return 0
-
-        delivered = status_breakdown.get('delivered', 0) + status_breakdown.get('read', 0)
-        return (delivered / total_sent) * 100
-
-    def _calculate_read_rate(self, status_breakdown: Dict) -> float:
-        """Calculate message read rate."""
-        total_delivered = status_breakdown.get('delivered', 0) + status_breakdown.get('read', 0)
-
-        if total_delivered == 0:
-            return 0
-
-        read = status_breakdown.get('read', 0)
-        return (read / total_delivered) * 100
\ No newline at end of file
+            ).update(
+                self._status_values(MessageStatus(status.lower())),
+                synchronize_session=False
+            )
@@ -0,0 +1,84 @@
+"""
+WhatsApp Tasks
+
+Celery tasks that drain WhatsApp work queued by the web tier.
+"""
+
+from typing import Optional, Union
+
+import requests
+
+from ..core.celery_app import celery_app
+from ..core.database import WorkerSession
+from ..models import MessageStatus
+from ..services.whatsapp_service import WhatsAppService
+
+
+@celery_app.task(bind=True, name="whatsapp.send_message", max_retries=3)
+def send_whatsapp_message_task(self, message_id: int) -> None:
+    """Deliver a queued outbound WhatsApp message, retrying transport errors."""
+    db = WorkerSession()
+    try:
+        service = WhatsAppService(db)
+        try:
+            service.dispatch_message(message_id)
+        except requests.RequestException as exc:
+            if self.request.retries >= self.max_retries:
+                message = service.get_message_by_id(message_id)
+                message.error_message = str(exc)
+                service.update_message_status(message_id, MessageStatus.FAILED)
+                return
+            raise self.retry(exc=exc, countdown=2 ** self.request.retries)
+    finally:
+        WorkerSession.remove()
+
+
+@celery_app.task(name="whatsapp.mark_sent")
+def mark_sent_task(message_id: int) -> bool:
+    """Mark a simulated outbound message as sent."""
+    db = WorkerSession()
+    try:
+        return WhatsAppService(db).mark_message_status(message_id, MessageStatus.SENT)
+    finally:
+        WorkerSession.remove()
+
+
+@celery_app.task(name="whatsapp.mark_delivered")
+def mark_delivered_task(message_id: int) -> bool:
+    """Mark a simulated outbound message as delivered."""
+    db = WorkerSession()
+    try:
+        return WhatsAppService(db).mark_message_status(message_id, MessageStatus.DELIVERED)
+    finally:
+        WorkerSession.remove()
+
+
+@celery_app.task(name="whatsapp.dispatch_scheduled")
+def dispatch_scheduled_messages_task() -> int:
+    """Claim due scheduled messages and fan them out to the send queue."""
+    db = WorkerSession()
+    try:
+        return len(WhatsAppService(db).claim_scheduled_messages())
+    finally:
+        WorkerSession.remove()
+
+
+@celery_app.task(name="whatsapp.process_webhook")
+def process_webhook_task(raw_body: Union[bytes, str]) -> Optional[int]:
+    """Persist and process a raw WhatsApp webhook body."""
+    db = WorkerSession()
+    try:
+        webhook = WhatsAppService(db).process_webhook(raw_body)
+        return webhook.id if webhook else None
+    finally:
+        WorkerSession.remove()
+
+
+@celery_app.task(name="whatsapp.requeue_stale")
+def requeue_stale_sending_task() -> int:
+    """Return messages whose send task was lost to the scheduler."""
+    db = WorkerSession()
+    try:
+        return WhatsAppService(db).requeue_stale_sending()
+    finally:
+        WorkerSession.remove()
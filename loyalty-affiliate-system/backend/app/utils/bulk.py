@@ -0,0 +1,78 @@
+"""
+Bulk write helpers.
+
+Core executemany and PostgreSQL COPY paths for loading many rows at once.
+"""
+
+import csv
+import io
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+# Batches smaller than this go through executemany rather than COPY
+COPY_THRESHOLD = 100
+
+
+def bulk_insert(db: Session, model, rows: list):
+    """Insert plain row dicts through a Core executemany, bypassing the ORM."""
+    # Core executemany without .returning() emits no RETURNING clause, so generated
+    # keys are never shipped back; callers re-select the rows they need.
+    # An empty parameter list would execute a single default-valued INSERT
+    if rows:
+        db.execute(model.__table__.insert(), rows)
+
+
+def bulk_load(db: Session, model, rows: list, copy_threshold: int = COPY_THRESHOLD):
+    """Load row dicts with COPY on PostgreSQL (psycopg2), falling back to bulk_insert."""
+    if not rows:
+        return
+
+    # COPY's fixed setup cost only pays off past a handful of rows
+    dialect = db.get_bind().dialect
+    if dialect.name != "postgresql" or dialect.driver != "psycopg2" or len(rows) < copy_threshold:
+        bulk_insert(db, model, rows)
+        return
+
+    table = model.__table__
+    if "id" not in rows[0]:
+        # Reserve the batch's ids from the sequence in one round trip and send them inline
+        ids = db.execute(
+            text("SELECT nextval(pg_get_serial_sequence(:table, 'id')) FROM generate_series(1, :n)"),
+            {"table": table.name, "n": len(rows)},
+        ).scalars().all()
+        for row, row_id in zip(rows, ids):
+            row["id"] = row_id
+
+    # COPY bypasses SQLAlchemy, so scalar Python-side defaults must be written explicitly;
+    # server defaults such as created_at still apply to omitted columns
+    defaults = {
+        column.name: column.default.arg
+        for column in table.columns
+        if column.name not in rows[0] and column.default is not None and column.default.is_scalar
+    }
+    columns = list(rows[0]) + list(defaults)
+    processors = [table.c[name].type.bind_processor(dialect) for name in columns]
+
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for row in rows:
+        values = []
+        for name, process in zip(columns, processors):
+            value = row[name] if name in row else defaults[name]
+            if process is not None:
+                value = process(value)
+            values.append("\\N" if value is None else value)
+        writer.writerow(values)
+    buffer.seek(0)
+
+    quote = dialect.identifier_preparer.quote
+    copy_sql = (
+        f"COPY {quote(table.name)} ({', '.join(quote(name) for name in columns)}) "
+        f"FROM STDIN WITH (FORMAT csv, NULL '\\N')"
+    )
+    cursor = db.connection().connection.cursor()
+    try:
+        cursor.copy_expert(copy_sql, buffer)
+    finally:
+        cursor.close()
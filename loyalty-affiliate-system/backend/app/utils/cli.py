@@ -9,12 +9,8 @@ Usage:
 
 import sys
 import click
-from sqlalchemy.orm import Session
-from alembic.config import Config
-from alembic import command
 
 from ..core.database import engine, Base
-from .seed_data import run_seed
 
 
 @click.group()
@@ -32,14 +28,16 @@ def init_db():
 
 
 @cli.command()
-def seed_data():
+@click.option("--force", is_flag=True, help="Delete existing data and re-seed an already seeded database.")
+def seed_data(force):
     """Populate database with sample data."""
     from ..core.database import SessionLocal
+    from .seed_data import run_seed
 
     click.echo("Seeding database with sample data...")
     db = SessionLocal()
     try:
-        run_seed(db)
+        run_seed(db, force=force)
         click.echo("✅ Database seeded successfully!")
     except Exception as e:
         click.echo(f"❌ Error seeding database: {e}", err=True)
@@ -56,11 +54,17 @@ def reset_db():
         click.echo("Operation cancelled.")
         return
 
-    click.echo("Dropping all tables...")
-    Base.metadata.drop_all(bind=engine)
+    # Drop and recreate in one transaction so a failed reset leaves the schema untouched
+    with engine.begin() as conn:
+        if conn.dialect.name == "postgresql":
+            # Throwaway DDL: skip waiting on WAL flush at commit
+            conn.exec_driver_sql("SET LOCAL synchronous_commit TO OFF")
 
-    click.echo("Recreating all tables...")
-    Base.metadata.create_all(bind=engine)
+        click.echo("Dropping all tables...")
+        Base.metadata.drop_all(bind=conn)
+
+        click.echo("Recreating all tables...")
+        Base.metadata.create_all(bind=conn)
 
     click.echo("✅ Database reset successfully!")
 
@@ -77,6 +81,8 @@ def create_migration():
     from app.models.affiliate import Affiliate, CustomerReferral, AffiliateCommission, PayoutRequest, AffiliateStatus, CommissionStatus
     from app.models.whatsapp import WhatsAppMessage, NotificationTemplate, WhatsAppWebhook, MessageType, MessageDirection, MessageStatus, TemplateCategory
     from app.models.birthday import BirthdayPromotion, BirthdaySchedule, PromotionStatus
+    from alembic import command
+    from alembic.config import Config
 
     click.echo("Creating new migration...")
     alembic_cfg = Config("alembic.ini")
@@ -92,6 +98,9 @@ def create_migration():
 @cli.command()
 def upgrade_db():
     """Upgrade database to latest migration."""
+    from alembic import command
+    from alembic.config import Config
+
     click.echo("Upgrading database...")
     alembic_cfg = Config("alembic.ini")
 
@@ -11,8 +11,11 @@ This script populates the database with sample data including:
 - Birthday promotions
 """
 
-from datetime import datetime, timedelta, date
-from sqlalchemy.orm import Session
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+import itertools
+from sqlalchemy.orm import Session, joinedload
 from sqlalchemy.sql import text
 import random
 import json
@@ -23,22 +26,73 @@ from ..models import (
     CustomerKid,
     LoyaltyTransaction, TransactionType, TransactionSource,
     Reward, RewardStatus,
-    RewardRedemption,
     TierBenefit,
     Affiliate, AffiliateStatus,
     CustomerReferral,
-    AffiliateCommission, CommissionStatus,
-    NotificationTemplate, TemplateCategory, MessageType,
-    BirthdayPromotion, PromotionStatus,
-    BirthdaySchedule
+    NotificationTemplate, TemplateCategory, MessageType
 )
+from ..core.database import Base
 from ..core.security import get_password_hash
+from .bulk import bulk_insert, bulk_load
+
+
+# Rows buffered per executemany for the high-volume seeders
+SEED_BATCH_SIZE = 1000
+
+# Constant metadata payloads, encoded once instead of per seeded row
+_SEED_META = json.dumps({"source": "seed_data"})
+_SEED_CAMPAIGN_META = json.dumps({"campaign": "seed_data"})
+
+# Every 1-3 channel marketing mix an affiliate can be seeded with, pre-encoded as JSON
+MARKETING_CHANNELS = ["social_media", "blog", "email", "website", "youtube"]
+_CHANNEL_COMBOS = [
+    json.dumps(list(combo))
+    for k in (1, 2, 3)
+    for combo in itertools.combinations(MARKETING_CHANNELS, k)
+]
+
+# (exclusive customer index cutoff, tier, points range) in seeding order
+TIER_BUCKETS = [
+    (2, CustomerTier.PLATINUM, (1000, 2000)),  # First 2 customers are platinum
+    (5, CustomerTier.GOLD, (500, 999)),        # Next 3 are gold
+    (8, CustomerTier.SILVER, (200, 499)),      # Next 3 are silver
+    (10**9, CustomerTier.BRONZE, (0, 199)),    # Rest are bronze
+]
+
+
+@contextmanager
+def _deferred_indexes(db: Session, models: list):
+    """Drop secondary indexes on PostgreSQL while rows load, then rebuild them."""
+    if db.get_bind().dialect.name != "postgresql":
+        yield
+        return
+
+    # Keep primary keys and unique indexes; they guard the data being loaded
+    index_defs = db.execute(text(
+        "SELECT i.relname, pg_get_indexdef(i.oid) FROM pg_index x "
+        "JOIN pg_class i ON i.oid = x.indexrelid "
+        "WHERE x.indrelid = ANY(CAST(:tables AS regclass[])) "
+        "AND NOT x.indisprimary AND NOT x.indisunique"
+    ), {"tables": [model.__tablename__ for model in models]}).all()
+
+    quote = db.get_bind().dialect.identifier_preparer.quote
+    for name, _ in index_defs:
+        db.execute(text(f"DROP INDEX {quote(name)}"))
+
+    # On failure the seed transaction rolls back, restoring the dropped indexes
+    yield
+
+    for _, definition in index_defs:
+        db.execute(text(definition))
 
 
 def seed_users(db: Session):
     """Create sample users with different roles."""
     print("Seeding users...")
 
+    # One timestamp per seeder; the clock is read once, not per row
+    now = datetime.utcnow()
+
     users_data = [
         {
             "name": "System Administrator",
@@ -146,21 +200,26 @@ def seed_users(db: Session):
         }
     ]
 
-    for user_data in users_data:
-        user = User(
-            name=user_data["name"],
-            email=user_data["email"],
-            phone=user_data["phone"],
-            password_hash=get_password_hash(user_data["password"]),
-            role=user_data["role"],
-            status=user_data["status"],
-            email_verified=True,
-            phone_verified=True,
-            created_at=datetime.utcnow()
-        )
-        db.add(user)
-
-    db.commit()
+    # Most seed users share a password; hash each distinct one once since bcrypt dominates.
+    # bcrypt releases the GIL, so the distinct hashes are computed concurrently
+    passwords = list({user_data["password"] for user_data in users_data})
+    with ThreadPoolExecutor(max_workers=len(passwords)) as pool:
+        password_hashes = dict(zip(passwords, pool.map(get_password_hash, passwords)))
+
+    bulk_insert(db, User, [
+        {
+            "name": user_data["name"],
+            "email": user_data["email"],
+            "phone": user_data["phone"],
+            "password_hash": password_hashes[user_data["password"]],
+            "role": user_data["role"],
+            "status": user_data["status"],
+            "email_verified": True,
+            "phone_verified": True,
+            "created_at": now
+        }
+        for user_data in users_data
+    ])
     print(f"Created {len(users_data)} users")
 
 
@@ -168,6 +227,8 @@ def seed_tier_benefits(db: Session):
     """Create tier benefits for different customer tiers."""
     print("Seeding tier benefits...")
 
+    now = datetime.utcnow()
+
     benefits_data = [
         # Bronze tier benefits
         {"tier": CustomerTier.BRONZE, "benefit_type": "points_multiplier", "benefit_value": "1.0", "description": "1x points on all purchases"},
@@ -192,90 +253,80 @@ def seed_tier_benefits(db: Session):
         {"tier": CustomerTier.PLATINUM, "benefit_type": "exclusive_offers", "benefit_value": "true", "description": "Access to exclusive offers"},
     ]
 
-    for benefit_data in benefits_data:
-        benefit = TierBenefit(
-            tier=benefit_data["tier"],
-            benefit_type=benefit_data["benefit_type"],
-            benefit_value=benefit_data["benefit_value"],
-            description=benefit_data["description"],
-            is_active=True,
-            created_at=datetime.utcnow()
-        )
-        db.add(benefit)
-
-    db.commit()
+    bulk_insert(db, TierBenefit, [
+        {
+            **benefit_data,
+            "is_active": True,
+            "created_at": now
+        }
+        for benefit_data in benefits_data
+    ])
     print(f"Created {len(benefits_data)} tier benefits")
 
 
-def seed_customers(db: Session):
+def seed_customers(db: Session, customer_users: list):
     """Create sample customers with different tiers and activity levels."""
     print("Seeding customers...")
 
-    # Get users with customer role
-    customer_users = db.query(User).filter(User.role == UserRole.CUSTOMER).all()
+    now = datetime.utcnow()
 
     customers_data = []
     for i, user in enumerate(customer_users):
-        # Random tier assignment with some logic
-        if i < 2:  # First 2 customers are platinum
-            tier = CustomerTier.PLATINUM
-            points = random.randint(1000, 2000)
-        elif i < 5:  # Next 3 are gold
-            tier = CustomerTier.GOLD
-            points = random.randint(500, 999)
-        elif i < 8:  # Next 3 are silver
-            tier = CustomerTier.SILVER
-            points = random.randint(200, 499)
-        else:  # Rest are bronze
-            tier = CustomerTier.BRONZE
-            points = random.randint(0, 199)
-
-        customer = Customer(
-            user_id=user.id,
-            tier=tier,
-            total_points=points,
-            lifetime_points=points + random.randint(100, 500),
-            current_streak=random.randint(0, 30),
-            longest_streak=random.randint(30, 365),
-            status=CustomerStatus.ACTIVE,
-            joined_date=datetime.utcnow() - timedelta(days=random.randint(30, 365)),
-            last_activity=datetime.utcnow() - timedelta(days=random.randint(0, 7))
-        )
-        customers_data.append(customer)
-
-    for customer in customers_data:
-        db.add(customer)
-
-    db.commit()
+        tier, points_range = next((t, pr) for cutoff, t, pr in TIER_BUCKETS if i < cutoff)
+        points = random.randint(*points_range)
+
+        customers_data.append({
+            "user_id": user.id,
+            "tier": tier,
+            "total_points": points,
+            "lifetime_points": points + random.randint(100, 500),
+            "current_streak": random.randint(0, 30),
+            "longest_streak": random.randint(30, 365),
+            "status": CustomerStatus.ACTIVE,
+            "joined_date": now - timedelta(days=random.randint(30, 365)),
+            "last_activity": now - timedelta(days=random.randint(0, 7))
+        })
+
+    bulk_insert(db, Customer, customers_data)
     print(f"Created {len(customers_data)} customers")
 
 
-def seed_customer_kids(db: Session):
+def seed_customer_kids(db: Session, customers: list):
     """Create sample kids for customers."""
     print("Seeding customer kids...")
 
-    customers = db.query(Customer).all()
+    now = datetime.utcnow()
+
+    # Local aliases skip the module attribute lookup on every call in the row loop
+    choice, randint, rand = random.choice, random.randint, random.random
+
     kids_names = ["Emma", "Noah", "Olivia", "Liam", "Ava", "William", "Sophia", "James", "Isabella", "Oliver"]
 
+    kids = []
     for customer in customers:
         # 60% chance of having kids
-        if random.random() < 0.6:
-            num_kids = random.randint(1, 3)
+        if rand() < 0.6:
+            num_kids = randint(1, 3)
+            # Users arrive eagerly loaded; take the surname once per family, not per kid
+            last_name = customer.user.name.rsplit(" ", 1)[-1]
             for i in range(num_kids):
-                kid_name = f"{random.choice(kids_names)} {customer.user.name.split()[-1]}"
-                birth_date = datetime.utcnow() - timedelta(days=random.randint(365, 365*15))  # 1-15 years old
-
-                kid = CustomerKid(
-                    customer_id=customer.id,
-                    name=kid_name,
-                    date_of_birth=birth_date,
-                    gender=random.choice(["male", "female", "other"]),
-                    notes=f"Born on {birth_date.strftime('%B %d, %Y')}",
-                    is_active=True
-                )
-                db.add(kid)
-
-    db.commit()
+                kid_name = f"{choice(kids_names)} {last_name}"
+                birth_date = now - timedelta(days=randint(365, 365*15))  # 1-15 years old
+
+                kids.append({
+                    "customer_id": customer.id,
+                    "name": kid_name,
+                    "date_of_birth": birth_date,
+                    "gender": choice(["male", "female", "other"]),
+                    "notes": f"Born on {birth_date.strftime('%B %d, %Y')}",
+                    "is_active": True
+                })
+
+                if len(kids) >= SEED_BATCH_SIZE:
+                    bulk_load(db, CustomerKid, kids)
+                    kids.clear()
+
+    bulk_load(db, CustomerKid, kids)
     print("Created customer kids")
 
 
@@ -283,6 +334,8 @@ def seed_rewards(db: Session):
     """Create sample rewards catalog."""
     print("Seeding rewards...")
 
+    now = datetime.utcnow()
+
     rewards_data = [
         {
             "name": "Free Coffee",
@@ -358,230 +411,263 @@ def seed_rewards(db: Session):
         }
     ]
 
-    for reward_data in rewards_data:
-        reward = Reward(
-            name=reward_data["name"],
-            description=reward_data["description"],
-            points_required=reward_data["points_required"],
-            category=reward_data["category"],
-            stock_quantity=reward_data["stock_quantity"],
-            max_per_customer=reward_data["max_per_customer"],
-            is_featured=reward_data["is_featured"],
-            status=RewardStatus.ACTIVE,
-            created_at=datetime.utcnow()
-        )
-        db.add(reward)
-
-    db.commit()
+    bulk_insert(db, Reward, [
+        {
+            **reward_data,
+            "status": RewardStatus.ACTIVE,
+            "created_at": now
+        }
+        for reward_data in rewards_data
+    ])
     print(f"Created {len(rewards_data)} rewards")
 
 
-def seed_affiliates(db: Session):
+def seed_affiliates(db: Session, affiliate_users: list):
     """Create sample affiliates with different statuses."""
     print("Seeding affiliates...")
 
-    affiliate_users = db.query(User).filter(User.role == UserRole.AFFILIATE).all()
+    now = datetime.utcnow()
 
+    # Local aliases skip the module attribute lookup on every call in the row loop
+    choice, randint, rand = random.choice, random.randint, random.random
+
+    affiliates = []
     for user in affiliate_users:
-        affiliate_code = f"AFF{random.randint(1000, 9999)}"
-        affiliate = Affiliate(
-            user_id=user.id,
-            affiliate_code=affiliate_code,
-            referral_link=f"https://loyaltyapp.com/ref/{affiliate_code}",
-            status=random.choice([AffiliateStatus.ACTIVE, AffiliateStatus.APPROVED]),
-            commission_rate=random.choice([5.0, 7.5, 10.0, 15.0]),
-            total_earnings=random.randint(100, 1000),
-            total_paid=random.randint(50, 800),
-            unpaid_balance=random.randint(25, 200),
-            payment_method=random.choice(["bank_transfer", "paypal", "check"]),
-            website_url=f"https://example{random.randint(1, 100)}.com" if random.random() > 0.5 else None,
-            marketing_channels=json.dumps(random.sample(["social_media", "blog", "email", "website", "youtube"], random.randint(1, 3))),
-            joined_date=datetime.utcnow() - timedelta(days=random.randint(30, 365)),
-            last_activity=datetime.utcnow() - timedelta(days=random.randint(0, 7))
-        )
-        db.add(affiliate)
-
-    db.commit()
+        affiliate_code = f"AFF{randint(1000, 9999)}"
+        affiliates.append({
+            "user_id": user.id,
+            "affiliate_code": affiliate_code,
+            "referral_link": f"https://loyaltyapp.com/ref/{affiliate_code}",
+            "status": choice([AffiliateStatus.ACTIVE, AffiliateStatus.APPROVED]),
+            "commission_rate": choice([5.0, 7.5, 10.0, 15.0]),
+            "total_earnings": randint(100, 1000),
+            "total_paid": randint(50, 800),
+            "unpaid_balance": randint(25, 200),
+            "payment_method": choice(["bank_transfer", "paypal", "check"]),
+            "website_url": f"https://example{randint(1, 100)}.com" if rand() > 0.5 else None,
+            "marketing_channels": choice(_CHANNEL_COMBOS),
+            "joined_date": now - timedelta(days=randint(30, 365)),
+            "last_activity": now - timedelta(days=randint(0, 7))
+        })
+
+    bulk_insert(db, Affiliate, affiliates)
     print(f"Created {len(affiliate_users)} affiliates")
 
 
-def seed_notification_templates(db: Session):
+def seed_notification_templates(db: Session, admin_user: User):
     """Create WhatsApp message templates."""
     print("Seeding notification templates...")
 
-    admin_user = db.query(User).filter(User.role == UserRole.ADMIN).first()
+    now = datetime.utcnow()
 
     templates_data = [
         {
             "name": "Welcome Message",
             "category": TemplateCategory.WELCOME,
             "content": "Welcome to our loyalty program, {{name}}! 🎉 Thank you for joining us. You'll start earning points on your next purchase!",
-            "variables": json.dumps(["name"]),
+            "variables": ["name"],
             "message_type": MessageType.TEXT
         },
         {
             "name": "Birthday Greeting",
             "category": TemplateCategory.BIRTHDAY,
             "content": "Happy Birthday, {{name}}! 🎂 We hope you have a wonderful day. As our valued customer, enjoy {{discount}} on your next purchase!",
-            "variables": json.dumps(["name", "discount"]),
+            "variables": ["name", "discount"],
             "message_type": MessageType.TEXT
         },
         {
             "name": "Points Earned",
             "category": TemplateCategory.LOYALTY,
             "content": "Great news, {{name}}! You've earned {{points}} points for your recent purchase. Your current balance is {{total_points}} points!",
-            "variables": json.dumps(["name", "points", "total_points"]),
+            "variables": ["name", "points", "total_points"],
             "message_type": MessageType.TEXT
         },
         {
             "name": "Tier Upgrade",
             "category": TemplateCategory.LOYALTY,
             "content": "Congratulations, {{name}}! 🎉 You've been upgraded to {{tier}} tier! Enjoy enhanced benefits including {{benefit_description}}.",
-            "variables": json.dumps(["name", "tier", "benefit_description"]),
+            "variables": ["name", "tier", "benefit_description"],
             "message_type": MessageType.TEXT
         },
         {
             "name": "Affiliate Welcome",
             "category": TemplateCategory.AFFILIATE,
             "content": "Welcome to our affiliate program, {{name}}! Your affiliate code is {{affiliate_code}}. Start earning commissions by sharing your referral link!",
-            "variables": json.dumps(["name", "affiliate_code"]),
+            "variables": ["name", "affiliate_code"],
             "message_type": MessageType.TEXT
         },
         {
             "name": "Purchase Receipt",
             "category": TemplateCategory.BILL,
             "content": "Thank you for your purchase, {{name}}! Order #{{order_id}} has been confirmed. You've earned {{points}} loyalty points!",
-            "variables": json.dumps(["name", "order_id", "points"]),
+            "variables": ["name", "order_id", "points"],
             "message_type": MessageType.TEXT
         }
     ]
 
-    for template_data in templates_data:
-        template = NotificationTemplate(
-            name=template_data["name"],
-            category=template_data["category"],
-            message_type=template_data["message_type"],
-            content=template_data["content"],
-            variables=template_data["variables"],
-            is_active=True,
-            is_default=True,
-            created_by=admin_user.id,
-            created_at=datetime.utcnow()
-        )
-        db.add(template)
-
-    db.commit()
+    bulk_insert(db, NotificationTemplate, [
+        {
+            **template_data,
+            "is_active": True,
+            "is_default": True,
+            "created_by": admin_user.id,
+            "created_at": now
+        }
+        for template_data in templates_data
+    ])
     print(f"Created {len(templates_data)} notification templates")
 
 
-def seed_loyalty_transactions(db: Session):
+def seed_loyalty_transactions(db: Session, customers: list):
     """Create sample loyalty transactions."""
     print("Seeding loyalty transactions...")
 
-    customers = db.query(Customer).all()
+    now = datetime.utcnow()
+
+    # Local aliases skip the module attribute lookup on every call in the row loop
+    choice, randint, rand = random.choice, random.randint, random.random
+
     transaction_types = [TransactionType.EARNED, TransactionType.REDEEMED]
     sources = [TransactionSource.PURCHASE, TransactionSource.PROMOTION, TransactionSource.MANUAL]
 
+    transactions = []
     for customer in customers:
         # Create 5-15 random transactions per customer
-        num_transactions = random.randint(5, 15)
+        num_transactions = randint(5, 15)
 
         for i in range(num_transactions):
             # Determine if earned or redeemed (70% earned, 30% redeemed)
-            if random.random() < 0.7 and customer.total_points > 50:
+            if rand() < 0.7 and customer.total_points > 50:
                 trans_type = TransactionType.EARNED
-                points = random.randint(10, 100)
-                description = f"Earned points from {random.choice(['purchase', 'promotion', 'bonus'])}"
+                points = randint(10, 100)
+                description = f"Earned points from {choice(['purchase', 'promotion', 'bonus'])}"
             else:
                 trans_type = TransactionType.REDEEMED
-                available_points = min(customer.total_points, random.randint(25, 150))
+                available_points = min(customer.total_points, randint(25, 150))
                 points = -available_points  # Negative for redemptions
-                description = f"Redeemed points for {random.choice(['reward', 'discount', 'gift'])}"
-
-            transaction = LoyaltyTransaction(
-                user_id=customer.user_id,
-                customer_id=customer.id,
-                points=points,
-                transaction_type=trans_type,
-                source=random.choice(sources),
-                description=description,
-                reference_id=f"TXN{random.randint(10000, 99999)}",
-                metadata=json.dumps({"source": "seed_data"}),
-                created_at=datetime.utcnow() - timedelta(days=random.randint(0, 180))
-            )
-            db.add(transaction)
-
-    db.commit()
+                description = f"Redeemed points for {choice(['reward', 'discount', 'gift'])}"
+
+            transactions.append({
+                "user_id": customer.user_id,
+                "customer_id": customer.id,
+                "points": points,
+                "transaction_type": trans_type,
+                "source": choice(sources),
+                "description": description,
+                "reference_id": f"TXN{randint(10000, 99999)}",
+                "metadata": _SEED_META,
+                "created_at": now - timedelta(days=randint(0, 180))
+            })
+
+            if len(transactions) >= SEED_BATCH_SIZE:
+                bulk_load(db, LoyaltyTransaction, transactions)
+                transactions.clear()
+
+    bulk_load(db, LoyaltyTransaction, transactions)
     print(f"Created loyalty transactions for {len(customers)} customers")
 
 
-def seed_customer_referrals(db: Session):
+def seed_customer_referrals(db: Session, customers: list):
     """Create sample customer referrals."""
     print("Seeding customer referrals...")
 
+    now = datetime.utcnow()
+
+    # Local aliases skip the module attribute lookup on every call in the row loop
+    choice, randint = random.choice, random.randint
+
     affiliates = db.query(Affiliate).all()
-    customers = db.query(Customer).all()
 
+    referrals = []
     for affiliate in affiliates:
         # Each affiliate gets 2-8 referrals
-        num_referrals = random.randint(2, 8)
+        num_referrals = randint(2, 8)
 
-        for i in range(num_referrals):
-            # Pick a random customer (ensure not referring themselves)
-            available_customers = [c for c in customers if c.user_id != affiliate.user_id]
-            if not available_customers:
-                continue
+        # Candidate customers depend only on the affiliate (no self-referrals)
+        available_customers = [c for c in customers if c.user_id != affiliate.user_id]
+        if not available_customers:
+            continue
 
-            customer = random.choice(available_customers)
-            conversion_value = random.randint(50, 500)
+        for i in range(num_referrals):
+            customer = choice(available_customers)
+            conversion_value = randint(50, 500)
             commission_amount = conversion_value * (affiliate.commission_rate / 100)
 
-            referral = CustomerReferral(
-                affiliate_id=affiliate.id,
-                customer_id=customer.id,
-                referral_code_used=affiliate.affiliate_code,
-                referral_source=random.choice(["social_media", "email", "website", "word_of_mouth"]),
-                conversion_value=conversion_value,
-                commission_amount=commission_amount,
-                status="converted",
-                metadata=json.dumps({"campaign": "seed_data"}),
-                created_at=datetime.utcnow() - timedelta(days=random.randint(0, 90))
-            )
-            db.add(referral)
-
-    db.commit()
+            referrals.append({
+                "affiliate_id": affiliate.id,
+                "customer_id": customer.id,
+                "referral_code_used": affiliate.affiliate_code,
+                "referral_source": choice(["social_media", "email", "website", "word_of_mouth"]),
+                "conversion_value": conversion_value,
+                "commission_amount": commission_amount,
+                "status": "converted",
+                "metadata": _SEED_CAMPAIGN_META,
+                "created_at": now - timedelta(days=randint(0, 90))
+            })
+
+            if len(referrals) >= SEED_BATCH_SIZE:
+                bulk_load(db, CustomerReferral, referrals)
+                referrals.clear()
+
+    bulk_load(db, CustomerReferral, referrals)
     print(f"Created customer referrals for {len(affiliates)} affiliates")
 
 
-def run_seed(db: Session):
+def run_seed(db: Session, force: bool = False):
     """Run all seeding functions."""
+    # The seed admin marks an already-seeded database; re-seeding costs one query
+    already_seeded = db.query(User.id).filter(User.email == "admin@loyaltyapp.com").first() is not None
+    if already_seeded and not force:
+        print("Database already seeded, skipping.")
+        return
+
     print("Starting database seeding...")
 
-    # Clear existing data (optional - be careful in production!)
-    # db.query(BirthdayPromotion).delete()
-    # db.query(CustomerReferral).delete()
-    # db.query(AffiliateCommission).delete()
-    # db.query(LoyaltyTransaction).delete()
-    # db.query(RewardRedemption).delete()
-    # db.query(Reward).delete()
-    # db.query(TierBenefit).delete()
-    # db.query(CustomerKid).delete()
-    # db.query(Customer).delete()
-    # db.query(Affiliate).delete()
-    # db.query(NotificationTemplate).delete()
-    # db.query(User).delete()
-    # db.commit()
-
-    # Seed data in order (respecting foreign key constraints)
-    seed_tier_benefits(db)
-    seed_users(db)
-    seed_customers(db)
-    seed_customer_kids(db)
-    seed_rewards(db)
-    seed_affiliates(db)
-    seed_notification_templates(db)
-    seed_loyalty_transactions(db)
-    seed_customer_referrals(db)
+    dialect = db.get_bind().dialect.name
+
+    # Every seeder writes into one transaction; the whole seed commits once or not at all
+    try:
+        if dialect == "sqlite":
+            # Development databases only: skip fsync and FK checks for the bulk load
+            db.execute(text("PRAGMA synchronous=OFF"))
+            db.execute(text("PRAGMA foreign_keys=OFF"))
+        elif dialect == "postgresql" and db.execute(text("SELECT current_setting('is_superuser')")).scalar() == "on":
+            # Replica mode skips FK triggers; SET LOCAL reverts it when the seed commits
+            db.execute(text("SET LOCAL session_replication_role = replica"))
+
+        if already_seeded:
+            # Clear existing data (be careful in production!), children before parents
+            print("Clearing existing data...")
+            for table in reversed(Base.metadata.sorted_tables):
+                db.execute(table.delete())
+
+        # Seed data in order (respecting foreign key constraints)
+        seed_tier_benefits(db)
+        seed_users(db)
+
+        # Fetch the seeded users once and bucket them by role for the seeders that need them
+        users_by_role = {role: [] for role in UserRole}
+        for user in db.query(User).all():
+            users_by_role[user.role].append(user)
+
+        seed_customers(db, users_by_role[UserRole.CUSTOMER])
+
+        # Load customers with their users once and share them with every dependent seeder
+        customers = db.query(Customer).options(joinedload(Customer.user)).all()
+
+        # The high-volume child tables load without per-row index maintenance
+        with _deferred_indexes(db, [CustomerKid, LoyaltyTransaction, CustomerReferral]):
+            seed_customer_kids(db, customers)
+            seed_rewards(db)
+            seed_affiliates(db, users_by_role[UserRole.AFFILIATE])
+            seed_notification_templates(db, users_by_role[UserRole.ADMIN][0])
+            seed_loyalty_transactions(db, customers)
+            seed_customer_referrals(db, customers)
+
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
 
     print("Database seeding completed successfully! 🎉")
 
@@ -2,7 +2,6 @@
 """
 CLI runner script for database operations.
 """
-import sys
 from app.utils.cli import cli
 
 if __name__ == "__main__":
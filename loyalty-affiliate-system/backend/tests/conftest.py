@@ -5,12 +5,15 @@ This file contains common fixtures, test database setup,
 and shared test utilities for the loyalty system.
 """
 
+import asyncio
 import pytest
+import pytest_asyncio
 import os
 import tempfile
 from datetime import datetime, timedelta
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker, Session
+from sqlalchemy import create_engine, event, insert
+from sqlalchemy.engine import URL, make_url
+from sqlalchemy.orm import sessionmaker, scoped_session, Session
 from sqlalchemy.pool import StaticPool
 from unittest.mock import Mock, MagicMock
 
@@ -26,20 +29,83 @@ from app.models import (
     BirthdayPromotion, WhatsAppWebhook
 )
 
+# Resolve every mapper and relationship up front rather than inside the first test that
+# touches a model, so that test's timing (and any mapper error) is not attributed to it
+Base.registry.configure()
+
+# Fixed reference time for sample data, so fixture values are deterministic and shareable
+_FIXED_NOW = datetime(2024, 1, 1, 12, 0, 0)
+
 # Test database configuration
-TEST_DATABASE_URL = "sqlite:///:memory:"  # In-memory SQLite for testing
-
-# Create test database engine
-engine = create_engine(
-    TEST_DATABASE_URL,
-    connect_args={"check_same_thread": False},
-    poolclass=StaticPool,
-    echo=False  # Set to True for SQL query logging during tests
-)
+# Defaults to in-memory SQLite; set TEST_DATABASE_URL to run the suite against e.g. PostgreSQL in CI.
+# In-memory SQLite is private to its process, so each pytest-xdist worker gets its own database
+TEST_DATABASE_URL = os.environ.get("TEST_DATABASE_URL", "sqlite:///:memory:")
+
+# pytest-xdist names each worker gw0, gw1, ...; unset when the suite runs in one process
+_XDIST_WORKER = os.environ.get("PYTEST_XDIST_WORKER")
+
+
+def _worker_database_url(url: URL, worker: str) -> URL:
+    """Create a fresh database for this xdist worker on the server and return its URL."""
+    # Workers sharing one database would race on CREATE TYPE and drop each other's tables
+    worker_database = f"{url.database}_{worker}"
+    admin_engine = create_engine(url, isolation_level="AUTOCOMMIT")
+    try:
+        with admin_engine.connect() as conn:
+            quoted = conn.dialect.identifier_preparer.quote(worker_database)
+            conn.exec_driver_sql(f"DROP DATABASE IF EXISTS {quoted}")
+            conn.exec_driver_sql(f"CREATE DATABASE {quoted}")
+    finally:
+        admin_engine.dispose()
+    return url.set(database=worker_database)
+
+
+if TEST_DATABASE_URL.startswith("sqlite"):
+    # Create test database engine; one shared connection keeps the in-memory database alive
+    engine = create_engine(
+        TEST_DATABASE_URL,
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool,
+        echo=False  # Set to True for SQL query logging during tests
+    )
+
+    @event.listens_for(engine, "connect")
+    def _configure_sqlite_connection(dbapi_connection, connection_record):
+        # pysqlite's own transaction handling breaks SAVEPOINT; let SQLAlchemy emit BEGIN itself
+        dbapi_connection.isolation_level = None
+
+        # Test data is disposable: no durability or journaling work, no FK enforcement
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA synchronous=OFF")
+        cursor.execute("PRAGMA journal_mode=MEMORY")
+        cursor.execute("PRAGMA temp_store=MEMORY")
+        cursor.execute("PRAGMA foreign_keys=OFF")
+        cursor.close()
+
+    @event.listens_for(engine, "begin")
+    def _emit_begin(conn):
+        conn.exec_driver_sql("BEGIN")
+else:
+    database_url = make_url(TEST_DATABASE_URL)
+    if _XDIST_WORKER:
+        database_url = _worker_database_url(database_url, _XDIST_WORKER)
+    engine = create_engine(database_url, echo=False)
+
 
 # Create SessionLocal for tests
 TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Registry handing each test its session; bound to the shared test connection once per run
+TestingSession = scoped_session(TestingSessionLocal)
+
+
+@pytest.fixture(scope="session")
+def event_loop():
+    """Share one event loop across every async test instead of one loop per test."""
+    loop = asyncio.new_event_loop()
+    yield loop
+    loop.close()
+
 
 @pytest.fixture(scope="session")
 def test_engine():
@@ -57,34 +123,143 @@ def setup_test_database(test_engine):
     Base.metadata.drop_all(bind=test_engine)
 
 
-@pytest.fixture
-def db_session(test_engine):
-    """Create database session for tests."""
+@pytest.fixture(scope="session")
+def db_connection(test_engine, setup_test_database):
+    """Open one connection and outer transaction shared by every test."""
     connection = test_engine.connect()
     transaction = connection.begin()
-    session = TestingSessionLocal(bind=connection)
+    # Commits inside the code under test only release inner SAVEPOINTs
+    TestingSession.configure(bind=connection, join_transaction_mode="create_savepoint")
 
-    yield session
+    yield connection
 
-    # Rollback transaction and close session
-    session.close()
     transaction.rollback()
     connection.close()
 
 
 @pytest.fixture
-def mock_erp_connector():
-    """Create mock ERP connector for testing."""
-    mock_connector = Mock()
-    mock_connector.connect.return_value = True
-    mock_connector.test_connection.return_value = True
-    mock_connector.get_customers.return_value = []
-    mock_connector.get_products.return_value = []
-    mock_connector.get_sales.return_value = []
-    return mock_connector
+def db_session(db_connection):
+    """Create database session for tests, rolled back to a per-test SAVEPOINT."""
+    savepoint = db_connection.begin_nested()
+    session = TestingSession()
+
+    yield session
+
+    # Rollback the test's SAVEPOINT and close session
+    TestingSession.remove()
+    savepoint.rollback()
+
+
+@pytest_asyncio.fixture(scope="session")
+async def _app_client():
+    """Boot the FastAPI app and its async client once per process."""
+    import httpx
+    from app.main import app
+
+    # ASGITransport calls the app in-process and never runs its lifespan, so startup is paid once
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as c:
+        yield c
 
 
 @pytest.fixture
+def client(_app_client, db_session):
+    """Shared API client whose requests use the test's session, so their writes roll back with it."""
+    from app.core.database import get_db
+    from app.main import app
+
+    app.dependency_overrides[get_db] = lambda: db_session
+    yield _app_client
+    app.dependency_overrides.pop(get_db, None)
+
+
+@pytest.fixture(scope="session", autouse=True)
+def _fast_password_hashing():
+    """Hash passwords at bcrypt's minimum cost for the whole test session."""
+    from app.core.security import pwd_context
+
+    original = pwd_context.to_dict()
+    pwd_context.update(bcrypt__rounds=4)
+    yield
+    pwd_context.load(original)
+
+
+@pytest.fixture(scope="session", autouse=True)
+def _cached_password_hashes(_fast_password_hashing):
+    """Hash each distinct plaintext once per session; tests reuse a handful of fixed passwords."""
+    from app.core.security import get_password_hash
+
+    cache = {}
+
+    def cached_hash(password):
+        if password not in cache:
+            cache[password] = get_password_hash(password)
+        return cache[password]
+
+    # AuthService imports the helper by name, so patch it where it is looked up
+    with pytest.MonkeyPatch.context() as mp:
+        mp.setattr("app.services.auth_service.get_password_hash", cached_hash)
+        yield cached_hash
+
+
+@pytest.fixture(scope="session")
+def access_token_for():
+    """Mint a signed access token once per (user id, role) for the whole session.
+
+    A token carries only the user id and role, so one minted for a user an earlier test rolled
+    back is valid for whichever user holds that id now. Hits therefore rely on the database
+    reusing ids (SQLite rowids do); where it does not, every test user simply gets a fresh token.
+    """
+    from app.services.auth_service import AuthService
+
+    cache = {}
+
+    def mint(user_id, role):
+        if (user_id, role) not in cache:
+            # Outlive the session so a cached token never expires mid-run
+            cache[user_id, role] = AuthService(None).create_access_token(
+                user_id=user_id, role=role, expires_delta=timedelta(days=1)
+            )
+        return cache[user_id, role]
+
+    return mint
+
+
+@pytest.fixture(scope="session")
+def hashed_test_password(_cached_password_hashes):
+    """Hash the shared test password once, through the same cached hasher AuthService uses."""
+    return _cached_password_hashes("test_password123")
+
+
+def _restore_mock(mock, config):
+    """Clear recorded calls and per-test overrides, then re-apply the mock's configuration."""
+    mock.reset_mock(return_value=True, side_effect=True)
+    mock.configure_mock(**config)
+
+
+_ERP_CONNECTOR_CONFIG = {
+    "connect.return_value": True,
+    "test_connection.return_value": True,
+    "get_customers.return_value": [],
+    "get_products.return_value": [],
+    "get_sales.return_value": [],
+}
+
+
+@pytest.fixture(scope="session")
+def _erp_connector_prototype():
+    """Build the mock ERP connector once per session."""
+    return Mock(**_ERP_CONNECTOR_CONFIG)
+
+
+@pytest.fixture
+def mock_erp_connector(_erp_connector_prototype):
+    """Create mock ERP connector for testing."""
+    yield _erp_connector_prototype
+    _restore_mock(_erp_connector_prototype, _ERP_CONNECTOR_CONFIG)
+
+
+@pytest.fixture(scope="session")
 def sample_customer_data():
     """Sample customer data for testing."""
     return {
@@ -96,11 +271,11 @@ def sample_customer_data():
         "customer_type": "Regular",
         "credit_limit": 1000.00,
         "tax_id": "123-45-6789",
-        "sync_timestamp": datetime.utcnow()
+        "sync_timestamp": _FIXED_NOW
     }
 
 
-@pytest.fixture
+@pytest.fixture(scope="session")
 def sample_sale_data():
     """Sample sale data for testing."""
     return {
@@ -108,8 +283,8 @@ def sample_sale_data():
         "customer_erp_id": "CUST_001",
         "sale_amount": 150.00,
         "points_earned": 15,
-        "transaction_date": datetime.utcnow() - timedelta(days=1),
-        "sync_timestamp": datetime.utcnow()
+        "transaction_date": _FIXED_NOW - timedelta(days=1),
+        "sync_timestamp": _FIXED_NOW
     }
 
 
@@ -165,40 +340,63 @@ def test_affiliate_data():
     }
 
 
-# Mock fixtures for external services
-@pytest.fixture
-def mock_whatsapp_api():
-    """Mock WhatsApp API for testing."""
-    mock_api = Mock()
-    mock_api.send_message.return_value = {
+# Mock fixtures for external services; each mock is built once and restored after every test
+_WHATSAPP_API_CONFIG = {
+    "send_message.return_value": {
         "message_id": "msg_123",
         "status": "sent",
         "recipient": "+1234567890"
-    }
-    mock_api.send_template_message.return_value = {
+    },
+    "send_template_message.return_value": {
         "message_id": "msg_456",
         "status": "sent",
         "recipient": "+1234567890"
-    }
-    return mock_api
+    },
+}
+
+_NOTIFIER_CONFIG = {
+    "send.return_value": True,
+    "send_template.return_value": True,
+}
+
+
+@pytest.fixture(scope="session")
+def _whatsapp_api_prototype():
+    """Build the mock WhatsApp API once per session."""
+    return Mock(**_WHATSAPP_API_CONFIG)
 
 
 @pytest.fixture
-def mock_email_service():
+def mock_whatsapp_api(_whatsapp_api_prototype):
+    """Mock WhatsApp API for testing."""
+    yield _whatsapp_api_prototype
+    _restore_mock(_whatsapp_api_prototype, _WHATSAPP_API_CONFIG)
+
+
+@pytest.fixture(scope="session")
+def _email_service_prototype():
+    """Build the mock email service once per session."""
+    return Mock(**_NOTIFIER_CONFIG)
+
+
+@pytest.fixture
+def mock_email_service(_email_service_prototype):
     """Mock email service for testing."""
-    mock_email = Mock()
-    mock_email.send.return_value = True
-    mock_email.send_template.return_value = True
-    return mock_email
+    yield _email_service_prototype
+    _restore_mock(_email_service_prototype, _NOTIFIER_CONFIG)
+
+
+@pytest.fixture(scope="session")
+def _sms_service_prototype():
+    """Build the mock SMS service once per session."""
+    return Mock(**_NOTIFIER_CONFIG)
 
 
 @pytest.fixture
-def mock_sms_service():
+def mock_sms_service(_sms_service_prototype):
     """Mock SMS service for testing."""
-    mock_sms = Mock()
-    mock_sms.send.return_value = True
-    mock_sms.send_template.return_value = True
-    return mock_sms
+    yield _sms_service_prototype
+    _restore_mock(_sms_service_prototype, _NOTIFIER_CONFIG)
 
 
 # Test utilities
@@ -221,7 +419,7 @@ class TestUtils:
 
         user = User(**user_data)
         db_session.add(user)
-        db_session.commit()
+        db_session.flush()
         return user
 
     @staticmethod
@@ -245,7 +443,7 @@ class TestUtils:
 
         customer = Customer(**customer_data)
         db_session.add(customer)
-        db_session.commit()
+        db_session.flush()
         return customer
 
     @staticmethod
@@ -262,9 +460,18 @@ class TestUtils:
 
         transaction = LoyaltyTransaction(**transaction_data)
         db_session.add(transaction)
-        db_session.commit()
+        db_session.flush()
         return transaction
 
+    @staticmethod
+    def create_test_transactions_bulk(db_session, customer, n=5, **overrides):
+        """Create n test loyalty transactions with one bulk INSERT."""
+        rows = [
+            {**transaction_data, "user_id": customer.user_id, **overrides}
+            for transaction_data in TestDataGenerator.generate_transactions(customer.id, n)
+        ]
+        return db_session.scalars(insert(LoyaltyTransaction).returning(LoyaltyTransaction), rows).all()
+
     @staticmethod
     def create_test_reward(db_session, **overrides):
         """Create a test reward."""
@@ -280,7 +487,7 @@ class TestUtils:
 
         reward = Reward(**reward_data)
         db_session.add(reward)
-        db_session.commit()
+        db_session.flush()
         return reward
 
 
@@ -305,6 +512,48 @@ def pytest_configure(config):
     config.addinivalue_line(
         "markers", "whatsapp: marks tests related to WhatsApp integration"
     )
+    config.addinivalue_line(
+        "markers", "no_db: marks tests that never touch the database"
+    )
+
+
+# Per-test call durations from earlier runs, kept in pytest's cache directory
+_DURATIONS_CACHE_KEY = "loyalty/durations"
+_session_durations = {}
+
+
+def pytest_collection_modifyitems(config, items):
+    """Run each module's tests fastest-first, using durations recorded by earlier runs."""
+    # The cache is unavailable under -p no:cacheprovider
+    cache = getattr(config, "cache", None)
+    if cache is None:
+        return
+    durations = cache.get(_DURATIONS_CACHE_KEY, {})
+    if not durations:
+        return
+
+    # Stable sort within each module so module fixtures and --dist=loadfile grouping are kept;
+    # --failed-first still moves failures to the front afterwards
+    module_order = {}
+    for index, item in enumerate(items):
+        module_order.setdefault(item.nodeid.split("::")[0], index)
+    items.sort(key=lambda item: (module_order[item.nodeid.split("::")[0]], durations.get(item.nodeid, 0.0)))
+
+
+def pytest_runtest_logreport(report):
+    """Record how long each test's call phase took."""
+    if report.when == "call":
+        _session_durations[report.nodeid] = report.duration
+
+
+def pytest_sessionfinish(session):
+    """Merge this run's durations into the cache; xdist workers leave it to the controller."""
+    cache = getattr(session.config, "cache", None)
+    if cache is None or hasattr(session.config, "workerinput") or not _session_durations:
+        return
+    durations = cache.get(_DURATIONS_CACHE_KEY, {})
+    durations.update(_session_durations)
+    cache.set(_DURATIONS_CACHE_KEY, durations)
 
 
 # Environment variables for testing
@@ -321,16 +570,16 @@ class TestDataGenerator:
     @staticmethod
     def generate_customers(n=10):
         """Generate test customer data."""
-        customers = []
-        for i in range(n):
-            customers.append({
+        return [
+            {
                 "name": f"Test Customer {i+1}",
                 "email": f"customer{i+1}@example.com",
                 "phone": f"+12345678{i:02d}",
                 "role": UserRole.CUSTOMER,
                 "status": UserStatus.ACTIVE
-            })
-        return customers
+            }
+            for i in range(n)
+        ]
 
     @staticmethod
     def generate_transactions(customer_id, n=5):
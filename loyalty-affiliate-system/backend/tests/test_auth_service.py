@@ -9,6 +9,7 @@ import pytest
 from unittest.mock import Mock, patch, MagicMock
 from datetime import datetime, timedelta
 import bcrypt
+from freezegun import freeze_time
 from jose import jwt, JWTError
 
 from app.services.auth_service import AuthService
@@ -17,6 +18,26 @@ from app.core.config import settings
 from app.core.security import verify_password
 
 
+@pytest.fixture(scope="module")
+def test_user_id(db_connection, hashed_test_password):
+    """Insert the shared auth test user once per module, inside a module SAVEPOINT."""
+    savepoint = db_connection.begin_nested()
+    user_id = db_connection.execute(User.__table__.insert().values(
+        name="Test User",
+        email="test@example.com",
+        phone="+1234567890",
+        password_hash=hashed_test_password,
+        role=UserRole.CUSTOMER,
+        status=UserStatus.ACTIVE,
+        email_verified=True,
+        phone_verified=True
+    )).inserted_primary_key[0]
+
+    yield user_id
+
+    savepoint.rollback()
+
+
 class TestAuthService:
     """Test cases for AuthService."""
 
@@ -26,29 +47,19 @@ class TestAuthService:
         return AuthService(db_session)
 
     @pytest.fixture
-    def test_user(self, db_session):
-        """Create test user for authentication testing."""
-        password = "test_password123"
-        hashed_password = bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
+    def auth_service_nodb(self):
+        """Create auth service instance for tests that never touch the database."""
+        return AuthService(db=None)
 
-        user = User(
-            name="Test User",
-            email="test@example.com",
-            phone="+1234567890",
-            password_hash=hashed_password,
-            role=UserRole.CUSTOMER,
-            status=UserStatus.ACTIVE,
-            email_verified=True,
-            phone_verified=True
-        )
-        db_session.add(user)
-        db_session.commit()
-        return user
+    @pytest.fixture
+    def test_user(self, db_session, test_user_id):
+        """Load the shared test user; per-test changes roll back with the test's SAVEPOINT."""
+        return db_session.get(User, test_user_id)
 
-    def test_hash_password(self, auth_service):
+    def test_hash_password(self, auth_service_nodb):
         """Test password hashing."""
         password = "test_password123"
-        hashed = auth_service.hash_password(password)
+        hashed = auth_service_nodb.hash_password(password)
 
         assert isinstance(hashed, str)
         assert len(hashed) > 0
@@ -89,12 +100,8 @@ class TestAuthService:
         assert "token_type" in result
         assert result["token_type"] == "bearer"
 
-        # Verify token structure
-        token_data = jwt.decode(
-            result["access_token"],
-            settings.SECRET_KEY,
-            algorithms=[settings.ALGORITHM]
-        )
+        # Verify token structure; the HS256 signature itself is covered by test_create_access_token
+        token_data = jwt.get_unverified_claims(result["access_token"])
         assert token_data["sub"] == str(test_user.id)
         assert token_data["role"] == UserRole.CUSTOMER.value
 
@@ -118,22 +125,19 @@ class TestAuthService:
 
         assert "Invalid credentials" in str(exc_info.value)
 
-    def test_authenticate_user_inactive_account(self, auth_service, db_session):
+    def test_authenticate_user_inactive_account(self, auth_service, db_session, hashed_test_password):
         """Test authentication with inactive account."""
         # Create inactive user
-        password = "test_password123"
-        hashed_password = bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
-
         inactive_user = User(
             name="Inactive User",
             email="inactive@example.com",
             phone="+1234567891",
-            password_hash=hashed_password,
+            password_hash=hashed_test_password,
             role=UserRole.CUSTOMER,
             status=UserStatus.INACTIVE
         )
         db_session.add(inactive_user)
-        db_session.commit()
+        db_session.flush()
 
         with pytest.raises(ValueError) as exc_info:
             auth_service.authenticate_user(
@@ -143,13 +147,13 @@ class TestAuthService:
 
         assert "Account is inactive" in str(exc_info.value)
 
-    def test_create_access_token(self, auth_service):
+    def test_create_access_token(self, auth_service_nodb):
         """Test JWT token creation."""
         user_id = 123
         role = UserRole.CUSTOMER.value
         expires_delta = timedelta(minutes=30)
 
-        token = auth_service.create_access_token(
+        token = auth_service_nodb.create_access_token(
             user_id=user_id,
             role=role,
             expires_delta=expires_delta
@@ -157,7 +161,7 @@ class TestAuthService:
 
         assert isinstance(token, str)
 
-        # Decode and verify token
+        # Decode and verify token, including its HS256 signature
         payload = jwt.decode(
             token,
             settings.SECRET_KEY,
@@ -169,13 +173,10 @@ class TestAuthService:
         assert "exp" in payload
         assert "iat" in payload
 
-    def test_verify_token_success(self, auth_service):
+    def test_verify_token_success(self, auth_service, access_token_for):
         """Test successful token verification."""
         # Create a valid token
-        token = auth_service.create_access_token(
-            user_id=123,
-            role=UserRole.CUSTOMER.value
-        )
+        token = access_token_for(123, UserRole.CUSTOMER.value)
 
         # Verify the token
         payload = auth_service.verify_token(token)
@@ -183,24 +184,24 @@ class TestAuthService:
         assert payload["sub"] == "123"
         assert payload["role"] == UserRole.CUSTOMER.value
 
-    def test_verify_token_expired(self, auth_service):
+    def test_verify_token_expired(self, auth_service_nodb):
         """Test expired token verification."""
         # Create token with very short expiry
-        token = auth_service.create_access_token(
+        token = auth_service_nodb.create_access_token(
             user_id=123,
             role=UserRole.CUSTOMER.value,
             expires_delta=timedelta(seconds=-1)  # Already expired
         )
 
         with pytest.raises(jwt.ExpiredSignatureError):
-            auth_service.verify_token(token)
+            auth_service_nodb.verify_token(token)
 
-    def test_verify_token_invalid(self, auth_service):
+    def test_verify_token_invalid(self, auth_service_nodb):
         """Test invalid token verification."""
         invalid_token = "invalid.jwt.token"
 
         with pytest.raises(JWTError):
-            auth_service.verify_token(invalid_token)
+            auth_service_nodb.verify_token(invalid_token)
 
     def test_refresh_token_success(self, auth_service, test_user):
         """Test successful token refresh."""
@@ -220,12 +221,12 @@ class TestAuthService:
         # Verify new token is different
         assert refresh_result["access_token"] != auth_result["access_token"]
 
-    def test_refresh_token_invalid(self, auth_service):
+    def test_refresh_token_invalid(self, auth_service_nodb):
         """Test invalid refresh token."""
         invalid_refresh_token = "invalid.refresh.token"
 
         with pytest.raises(ValueError) as exc_info:
-            auth_service.refresh_token(invalid_refresh_token)
+            auth_service_nodb.refresh_token(invalid_refresh_token)
 
         assert "Invalid refresh token" in str(exc_info.value)
 
@@ -333,13 +334,10 @@ class TestAuthService:
         """Test permission checking for invalid user."""
         assert not auth_service.has_permission(99999, "any_permission")
 
-    def test_get_user_by_token_success(self, auth_service, test_user):
+    def test_get_user_by_token_success(self, auth_service, test_user, access_token_for):
         """Test getting user by valid token."""
         # Create token for user
-        token = auth_service.create_access_token(
-            user_id=test_user.id,
-            role=test_user.role.value
-        )
+        token = access_token_for(test_user.id, test_user.role.value)
 
         # Get user by token
         user = auth_service.get_user_by_token(token)
@@ -416,16 +414,17 @@ class TestAuthService:
         assert "token_type" in result
         assert result["token_type"] == "bearer"
 
-    def test_password_strength_validation(self, auth_service):
+    def test_password_strength_validation(self, auth_service_nodb):
         """Test password strength validation."""
         # Test weak password
         weak_password = "123"
-        assert not auth_service._validate_password_strength(weak_password)
+        assert not auth_service_nodb._validate_password_strength(weak_password)
 
         # Test strong password
         strong_password = "StrongPass123!"
-        assert auth_service._validate_password_strength(strong_password)
+        assert auth_service_nodb._validate_password_strength(strong_password)
 
+    @pytest.mark.slow
     def test_rate_limiting_simulation(self, auth_service, test_user):
         """Test rate limiting simulation for login attempts."""
         # Simulate multiple failed login attempts
@@ -439,6 +438,7 @@ class TestAuthService:
         # In a real implementation, this might trigger rate limiting
         # For this test, we just verify the function doesn't crash
 
+    @pytest.mark.slow
     def test_audit_logging(self, auth_service, test_user):
         """Test that authentication events are logged."""
         # This is a conceptual test - in real implementation,
@@ -452,24 +452,22 @@ class TestAuthService:
         # In real implementation, we would verify audit log entries
         # For this test, we just ensure the function completes
 
-    def test_token_expiration_handling(self, auth_service):
+    def test_token_expiration_handling(self, auth_service_nodb):
         """Test token expiration handling."""
         # Create token with short expiration
-        token = auth_service.create_access_token(
+        token = auth_service_nodb.create_access_token(
             user_id=123,
             role=UserRole.CUSTOMER.value,
             expires_delta=timedelta(seconds=1)
         )
 
-        # Wait for token to expire
-        import time
-        time.sleep(2)
-
-        # Should raise ExpiredSignatureError
-        with pytest.raises(jwt.ExpiredSignatureError):
-            auth_service.verify_token(token)
+        # Jump past the expiry instead of sleeping through it
+        with freeze_time(datetime.utcnow() + timedelta(seconds=5)):
+            # Should raise ExpiredSignatureError
+            with pytest.raises(jwt.ExpiredSignatureError):
+                auth_service_nodb.verify_token(token)
 
-    def test_csrf_protection(self, auth_service):
+    def test_csrf_protection(self, auth_service_nodb):
         """Test CSRF protection simulation."""
         # This is a conceptual test - in real implementation,
         # we would verify CSRF tokens are generated and validated
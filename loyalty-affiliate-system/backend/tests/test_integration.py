@@ -4,68 +4,75 @@ Integration Tests for Loyalty & Affiliate System
 Tests the complete flow from API endpoints through services to database operations.
 """
 
+import asyncio
+
 import pytest
-from fastapi.testclient import TestClient
 from sqlalchemy.orm import Session
 from datetime import datetime, timedelta
 
-from app.main import app
-from app.models import User, UserRole, UserStatus, Customer, CustomerTier
+from app.models import User, UserRole, UserStatus, Customer, CustomerTier, CustomerStatus, TransactionSource
 from app.services.auth_service import AuthService
 from app.services.customer_service import CustomerService
 from app.services.loyalty_service import LoyaltyService
 
 
 @pytest.fixture
-def client():
-    """Create test client."""
-    return TestClient(app)
+def customer_factory(db_session):
+    """Create a customer and its user with a single flush."""
+    password_hash = AuthService(db_session).hash_password("test_password123")
+
+    def create(name="Test User", email="test@example.com", phone="+1234567890",
+               tier=CustomerTier.BRONZE):
+        user = User(
+            name=name,
+            email=email,
+            phone=phone,
+            password_hash=password_hash,
+            role=UserRole.CUSTOMER,
+            status=UserStatus.ACTIVE,
+            email_verified=False,
+            phone_verified=False
+        )
+        customer = Customer(
+            user=user,
+            tier=tier,
+            total_points=0,
+            lifetime_points=0,
+            current_streak=0,
+            longest_streak=0,
+            status=CustomerStatus.ACTIVE
+        )
+        db_session.add_all([user, customer])
+        db_session.flush()
+        return customer
+
+    return create
 
 
 @pytest.fixture
-def db_session():
-    """Create database session for testing."""
-    from app.core.database import SessionLocal
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
+def test_customer(customer_factory):
+    """Create a test customer."""
+    return customer_factory()
 
 
 @pytest.fixture
-def test_user(db_session):
+def test_user(test_customer):
     """Create a test user."""
-    auth_service = AuthService(db_session)
-
-    user = auth_service.create_user(
-        name="Test User",
-        email="test@example.com",
-        phone="+1234567890",
-        password="test_password123",
-        role=UserRole.CUSTOMER
-    )
-
-    return user
+    return test_customer.user
 
 
 @pytest.fixture
-def test_customer(db_session, test_user):
-    """Create a test customer."""
-    customer_service = CustomerService(db_session)
-
-    customer = customer_service.create_customer(
-        user_id=test_user.id,
-        tier=CustomerTier.BRONZE
-    )
-
-    return customer
+def auth_headers(access_token_for, test_user):
+    """Bearer headers for this test's user, from the session token cache instead of a bcrypt login."""
+    token = access_token_for(test_user.id, test_user.role.value)
+    return {"Authorization": f"Bearer {token}"}
 
 
 class TestAuthIntegration:
     """Test authentication integration."""
 
-    def test_user_registration_and_login(self, client, db_session):
+    @pytest.mark.asyncio
+    async def test_user_registration_and_login(self, client, db_session):
         """Test complete user registration and login flow."""
         # Register user
         register_data = {
@@ -76,21 +83,21 @@ class TestAuthIntegration:
             "role": "customer"
         }
 
-        response = client.post("/api/v1/auth/register", json=register_data)
+        response = await client.post("/api/v1/auth/register", json=register_data)
         assert response.status_code == 200
 
         user_data = response.json()
         assert user_data["name"] == "Integration Test User"
-        assert user_data["email"] == "integration@example.com"
+        assert user_data["email"] == register_data["email"]
         assert user_data["role"] == "customer"
 
         # Login user
         login_data = {
-            "username": "integration@example.com",
+            "username": register_data["email"],
             "password": "integration123"
         }
 
-        response = client.post("/api/v1/auth/login", data=login_data)
+        response = await client.post("/api/v1/auth/login", data=login_data)
         assert response.status_code == 200
 
         tokens = response.json()
@@ -100,7 +107,7 @@ class TestAuthIntegration:
 
         # Test getting current user
         headers = {"Authorization": f"Bearer {tokens['access_token']}"}
-        response = client.get("/api/v1/auth/me", headers=headers)
+        response = await client.get("/api/v1/auth/me", headers=headers)
         assert response.status_code == 200
 
         user_info = response.json()
@@ -111,18 +118,11 @@ class TestAuthIntegration:
 class TestCustomerIntegration:
     """Test customer management integration."""
 
-    def test_customer_creation_and_management(self, client, db_session, test_user):
+    @pytest.mark.asyncio
+    async def test_customer_creation_and_management(self, client, db_session, test_user, auth_headers):
         """Test complete customer lifecycle."""
-        auth_service = AuthService(db_session)
         customer_service = CustomerService(db_session)
-
-        # Create tokens for test user
-        tokens = auth_service.authenticate_user(
-            email="test@example.com",
-            password="test_password123"
-        )
-
-        headers = {"Authorization": f"Bearer {tokens['access_token']}"}
+        headers = auth_headers
 
         # Get customer (should be auto-created)
         customer = customer_service.get_customer_by_user_id(test_user.id)
@@ -131,7 +131,7 @@ class TestCustomerIntegration:
         assert customer.total_points == 0
 
         # Test customer data retrieval via API
-        response = client.get(f"/api/v1/customers/{customer.id}", headers=headers)
+        response = await client.get(f"/api/v1/customers/{customer.id}", headers=headers)
         assert response.status_code == 200
 
         customer_data = response.json()
@@ -142,19 +142,11 @@ class TestCustomerIntegration:
 class TestLoyaltyIntegration:
     """Test loyalty program integration."""
 
-    def test_loyalty_points_flow(self, client, db_session, test_customer):
+    @pytest.mark.asyncio
+    async def test_loyalty_points_flow(self, client, db_session, test_customer, auth_headers):
         """Test complete loyalty points flow."""
-        auth_service = AuthService(db_session)
         loyalty_service = LoyaltyService(db_session)
-
-        # Get user and create tokens
-        user = db_session.query(User).filter(User.id == test_customer.user_id).first()
-        tokens = auth_service.authenticate_user(
-            email=user.email,
-            password="test_password123"
-        )
-
-        headers = {"Authorization": f"Bearer {tokens['access_token']}"}
+        headers = auth_headers
 
         # Award points
         points_data = {
@@ -164,7 +156,7 @@ class TestLoyaltyIntegration:
             "source": "manual"
         }
 
-        response = client.post("/api/v1/loyalty/points/award", json=points_data, headers=headers)
+        response = await client.post("/api/v1/loyalty/points/award", json=points_data, headers=headers)
         assert response.status_code == 200
 
         # Check points were awarded
@@ -173,7 +165,7 @@ class TestLoyaltyIntegration:
         assert customer.lifetime_points == 100
 
         # Test points summary
-        response = client.get(f"/api/v1/loyalty/points/{test_customer.id}", headers=headers)
+        response = await client.get(f"/api/v1/loyalty/points/{test_customer.id}", headers=headers)
         assert response.status_code == 200
 
         points_summary = response.json()
@@ -189,7 +181,7 @@ class TestLoyaltyIntegration:
             "source": "manual"
         }
 
-        response = client.post("/api/v1/loyalty/points/award", json=points_data, headers=headers)
+        response = await client.post("/api/v1/loyalty/points/award", json=points_data, headers=headers)
         assert response.status_code == 200
 
         # Check tier was upgraded
@@ -201,7 +193,8 @@ class TestLoyaltyIntegration:
 class TestEndToEndFlow:
     """Test complete end-to-end user flows."""
 
-    def test_complete_customer_journey(self, client, db_session):
+    @pytest.mark.asyncio
+    async def test_complete_customer_journey(self, client, db_session):
         """Test complete customer journey from registration to redemption."""
         # 1. Register user
         register_data = {
@@ -212,79 +205,67 @@ class TestEndToEndFlow:
             "role": "customer"
         }
 
-        response = client.post("/api/v1/auth/register", json=register_data)
+        response = await client.post("/api/v1/auth/register", json=register_data)
         assert response.status_code == 200
 
-        # 2. Login
-        login_data = {
-            "username": "journey@example.com",
-            "password": "journey123"
-        }
+        user_data = response.json()
 
-        response = client.post("/api/v1/auth/login", data=login_data)
-        assert response.status_code == 200
+        # 2-4. Log in and award the welcome bonus through the services; the HTTP paths for
+        # these steps are covered by TestAuthIntegration and TestLoyaltyIntegration
+        auth_service = AuthService(db_session)
+        loyalty_service = LoyaltyService(db_session)
 
-        tokens = response.json()
+        tokens = auth_service.authenticate_user(
+            email=register_data["email"],
+            password="journey123"
+        )
         headers = {"Authorization": f"Bearer {tokens['access_token']}"}
 
-        # 3. Get user info
-        response = client.get("/api/v1/auth/me", headers=headers)
-        assert response.status_code == 200
-
-        user_data = response.json()
-        assert user_data["name"] == "Journey Test User"
-
-        # 4. Get customer (should be auto-created)
         customer = db_session.query(Customer).filter(Customer.user_id == user_data["id"]).first()
         assert customer is not None
 
-        # 5. Award points
-        points_data = {
-            "customer_id": customer.id,
-            "points": 500,
-            "description": "Welcome bonus",
-            "source": "promotion"
-        }
-
-        response = client.post("/api/v1/loyalty/points/award", json=points_data, headers=headers)
-        assert response.status_code == 200
-
-        # 6. Check updated points
-        response = client.get(f"/api/v1/loyalty/points/{customer.id}", headers=headers)
-        assert response.status_code == 200
-
-        points_summary = response.json()
-        assert points_summary["total_points"] == 500
+        loyalty_service.award_points(
+            customer_id=customer.id,
+            points=500,
+            source=TransactionSource.PROMOTION,
+            description="Welcome bonus"
+        )
+        assert loyalty_service.get_customer_points_summary(customer.id)["current_balance"] == 500
 
-        # 7. Test transaction history
-        response = client.get(f"/api/v1/loyalty/transactions/{customer.id}", headers=headers)
+        # 5. One API probe: the transaction history must agree with the service's view
+        response = await client.get(f"/api/v1/loyalty/transactions/{customer.id}", headers=headers)
         assert response.status_code == 200
 
-        transactions = response.json()
+        transactions = response.json()["transactions"]
         assert len(transactions) == 1
         assert transactions[0]["points"] == 500
 
+        history = loyalty_service.get_transaction_history(customer.id)
+        assert [t["id"] for t in transactions] == [t.id for t in history["transactions"]]
+
 
 class TestErrorHandling:
     """Test error handling in the system."""
 
-    def test_invalid_authentication(self, client):
+    @pytest.mark.asyncio
+    async def test_invalid_authentication(self, client):
         """Test invalid authentication handling."""
-        # Test invalid login
-        response = client.post("/api/v1/auth/login", data={
-            "username": "invalid@example.com",
-            "password": "wrong_password"
-        })
-        assert response.status_code == 401
-
-        # Test accessing protected endpoint without auth
-        response = client.get("/api/v1/auth/me")
-        assert response.status_code == 401
-
-    def test_invalid_customer_operations(self, client, db_session):
+        # Invalid login and an unauthenticated protected request, issued together
+        login_response, me_response = await asyncio.gather(
+            client.post("/api/v1/auth/login", data={
+                "username": "invalid@example.com",
+                "password": "wrong_password"
+            }),
+            client.get("/api/v1/auth/me")
+        )
+        assert login_response.status_code == 401
+        assert me_response.status_code == 401
+
+    @pytest.mark.asyncio
+    async def test_invalid_customer_operations(self, client, db_session):
         """Test error handling for invalid customer operations."""
         # Try to get non-existent customer
-        response = client.get("/api/v1/customers/99999")
+        response = await client.get("/api/v1/customers/99999")
         assert response.status_code == 404
 
         # Try to award points to non-existent customer
@@ -295,34 +276,12 @@ class TestErrorHandling:
             "source": "manual"
         }
 
-        response = client.post("/api/v1/loyalty/points/award", json=points_data)
+        response = await client.post("/api/v1/loyalty/points/award", json=points_data)
         assert response.status_code == 401  # Should be unauthorized without auth
 
-    def test_insufficient_permissions(self, client, db_session):
+    @pytest.mark.asyncio
+    async def test_insufficient_permissions(self, client, db_session):
         """Test permission-based access control."""
         # Try to access admin endpoints without admin privileges
         # This would require creating a non-admin user and testing admin endpoints
         pass
-
-
-class TestSystemHealth:
-    """Test system health and monitoring endpoints."""
-
-    def test_health_check(self, client):
-        """Test health check endpoint."""
-        response = client.get("/health")
-        assert response.status_code == 200
-
-        health_data = response.json()
-        assert health_data["status"] == "healthy"
-        assert "message" in health_data
-
-    def test_root_endpoint(self, client):
-        """Test root endpoint."""
-        response = client.get("/")
-        assert response.status_code == 200
-
-        root_data = response.json()
-        assert "message" in root_data
-        assert "version" in root_data
-        assert "docs" in root_data
\ No newline at end of file
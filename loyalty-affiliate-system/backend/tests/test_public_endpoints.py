@@ -0,0 +1,41 @@
+"""
+Public Endpoint Tests
+
+Tests the unauthenticated health and root endpoints, which need no database.
+"""
+
+import pytest
+
+
+pytestmark = pytest.mark.no_db
+
+
+@pytest.fixture
+def client(_app_client):
+    """Use the shared API client without binding a test database session."""
+    return _app_client
+
+
+class TestSystemHealth:
+    """Test system health and monitoring endpoints."""
+
+    @pytest.mark.asyncio
+    async def test_health_check(self, client):
+        """Test health check endpoint."""
+        response = await client.get("/health")
+        assert response.status_code == 200
+
+        health_data = response.json()
+        assert health_data["status"] == "healthy"
+        assert "message" in health_data
+
+    @pytest.mark.asyncio
+    async def test_root_endpoint(self, client):
+        """Test root endpoint."""
+        response = await client.get("/")
+        assert response.status_code == 200
+
+        root_data = response.json()
+        assert "message" in root_data
+        assert "version" in root_data
+        assert "docs" in root_data
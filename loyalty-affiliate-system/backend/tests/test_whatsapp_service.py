@@ -0,0 +1,182 @@
+"""
+Unit tests for WhatsApp Service.
+
+Tests message history queries and relationship loading strategies.
+"""
+
+import pytest
+from datetime import datetime, timedelta
+from unittest.mock import patch
+from sqlalchemy import event
+from sqlalchemy.exc import InvalidRequestError
+
+from app.services.whatsapp_service import WhatsAppService, _render_template
+from app.models import (
+    User, Customer, CustomerTier, WhatsAppMessage,
+    MessageType, MessageDirection, MessageStatus
+)
+
+
+class TestWhatsAppService:
+    """Test cases for WhatsAppService."""
+
+    @pytest.fixture
+    def whatsapp_service(self, db_session):
+        """Create WhatsApp service instance."""
+        return WhatsAppService(db_session)
+
+    @pytest.fixture
+    def customer_with_messages(self, db_session):
+        """Create a customer with a page of outbound messages."""
+        user = User(
+            name="Test User",
+            email="whatsapp@example.com",
+            phone="1234567890",
+            role="customer",
+            status="active"
+        )
+        db_session.add(user)
+        db_session.flush()
+
+        customer = Customer(
+            user_id=user.id,
+            tier=CustomerTier.BRONZE,
+            total_points=0,
+            lifetime_points=0,
+            status="active",
+            joined_date=datetime.utcnow()
+        )
+        db_session.add(customer)
+        db_session.flush()
+
+        for i in range(10):
+            db_session.add(WhatsAppMessage(
+                user_id=user.id,
+                customer_id=customer.id,
+                message_type=MessageType.TEXT,
+                direction=MessageDirection.OUTBOUND,
+                content=f"Message {i}",
+                recipient_phone=user.phone,
+                status=MessageStatus.SENT
+            ))
+        db_session.commit()
+
+        return customer
+
+    @pytest.fixture
+    def statements(self, test_engine):
+        """Record every SQL statement executed against the test engine."""
+        executed = []
+
+        def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+            executed.append(statement)
+
+        event.listen(test_engine, "before_cursor_execute", before_cursor_execute)
+        yield executed
+        event.remove(test_engine, "before_cursor_execute", before_cursor_execute)
+
+    def test_message_history_query_count(self, whatsapp_service, customer_with_messages, statements):
+        """Test message history is served without per-row queries."""
+        result = whatsapp_service.get_message_history(customer_id=customer_with_messages.id, limit=50)
+
+        assert len(result["messages"]) == 10
+        assert result["pagination"]["total"] == 10
+        assert len(statements) <= 3
+
+    def test_get_message_by_id_forbids_lazy_loads(self, whatsapp_service, customer_with_messages, db_session):
+        """Test relationships on fetched messages must be loaded explicitly."""
+        message_id = db_session.query(WhatsAppMessage.id).first()[0]
+        db_session.expunge_all()
+
+        message = whatsapp_service.get_message_by_id(message_id)
+
+        with pytest.raises(InvalidRequestError):
+            message.customer
+
+    def test_render_template_numeric_placeholders(self):
+        """Test numeric and named placeholders render and literal braces are kept."""
+        content = _render_template(
+            "Hi {{1}}, your code is {{code}} {ok} {{missing}}",
+            {"1": "Ana", "code": 42}
+        )
+
+        assert content == "Hi Ana, your code is 42 {ok} {{missing}}"
+
+    def test_failed_webhook_releases_dedupe_key(self, whatsapp_service):
+        """Test a webhook that fails processing is not remembered as seen."""
+        with patch("app.services.whatsapp_service._redis_client") as redis_client, \
+                patch.object(WhatsAppService, "_process_webhook", side_effect=RuntimeError("boom")):
+            redis_client.set.return_value = True
+
+            with pytest.raises(RuntimeError):
+                whatsapp_service.process_webhook(b'{"id": "wamid.1", "event_type": "message"}')
+
+        dedupe_key = redis_client.set.call_args.args[0]
+        redis_client.delete.assert_called_once_with(dedupe_key)
+
+    @pytest.mark.parametrize("raw_body", [b"\xff\xfe", b"{not json", b"[1, 2]"])
+    def test_enqueue_webhook_rejects_unusable_bodies(self, whatsapp_service, raw_body):
+        """Test bodies the worker could not store are rejected before queueing."""
+        with patch("app.services.whatsapp_service.celery_app") as celery_app:
+            with pytest.raises(ValueError):
+                whatsapp_service.enqueue_webhook(raw_body)
+
+        celery_app.send_task.assert_not_called()
+
+    def test_claims_are_released_when_publish_fails(self, whatsapp_service, customer_with_messages, db_session):
+        """Test scheduled messages go back to PENDING if their send task cannot be queued."""
+        message = whatsapp_service.schedule_message(
+            recipient_phone="1234567890",
+            message_type=MessageType.TEXT,
+            content="Scheduled",
+            scheduled_time=datetime.utcnow() - timedelta(minutes=1),
+            user_id=customer_with_messages.user_id
+        )
+
+        with patch("app.services.whatsapp_service.celery_app") as celery_app:
+            celery_app.send_task.side_effect = ConnectionError("broker down")
+            with pytest.raises(ConnectionError):
+                whatsapp_service.claim_scheduled_messages()
+
+        db_session.refresh(message)
+        assert message.status == MessageStatus.PENDING
+
+    def test_requeue_stale_sending(self, whatsapp_service, customer_with_messages, db_session):
+        """Test only messages stuck in SENDING past the timeout are handed back."""
+        stale, fresh = (
+            WhatsAppMessage(
+                user_id=customer_with_messages.user_id,
+                message_type=MessageType.TEXT,
+                direction=MessageDirection.OUTBOUND,
+                content="Claimed",
+                recipient_phone="1234567890",
+                status=MessageStatus.SENDING,
+                status_timestamp=datetime.utcnow() - age
+            )
+            for age in (timedelta(hours=1), timedelta(minutes=1))
+        )
+        db_session.add_all([stale, fresh])
+        db_session.flush()
+
+        assert whatsapp_service.requeue_stale_sending() == 1
+
+        db_session.refresh(stale)
+        db_session.refresh(fresh)
+        assert stale.status == MessageStatus.PENDING
+        assert fresh.status == MessageStatus.SENDING
+
+    def test_message_webhook_skips_unknown_senders(self, whatsapp_service, customer_with_messages, db_session):
+        """Test an unknown sender in a batch does not stop the other messages being stored."""
+        whatsapp_service._handle_message_webhook({
+            "messages": [
+                {"id": "wamid.known", "from": "1234567890", "message": {"text": {"body": "Hi"}}},
+                {"id": "wamid.unknown", "from": "9999999999", "message": {"text": {"body": "Hello"}}}
+            ]
+        })
+
+        stored = {
+            message_id for (message_id,) in db_session.query(WhatsAppMessage.whatsapp_message_id).filter(
+                WhatsAppMessage.direction == MessageDirection.INBOUND
+            )
+        }
+        assert stored == {"wamid.known"}